@@ -1,76 +1,37 @@
-﻿import csv
+﻿import asyncio
+import csv
 import io
+import json
 import math
 import os
+import re
 import statistics
+import time
 from datetime import UTC, datetime
 from pathlib import Path
 
-from api_utils import fetch_json_with_cache, fetch_text_with_cache
+from api_utils import canonical_request_key, fetch_json_with_cache, fetch_text_with_cache
+from build_manifest import TIMESTAMP_LINE, write_if_changed
+from history_store import append_rows, last_per_month, last_timestamp, month_start
+from price_history import COINGECKO, get_crypto_history, stored_history
+from scoring_rubric import RUBRICS, rubric_name, score_asset
+from stats_kernel import SCENARIO_QUANTILES, price_stats
+from universe import assets
 
 REPORT_DIR = Path("reports")
+# One markdown section and one results file per asset, plus an index of each.
+SHARD_DIR = REPORT_DIR / "long_term"
+RESULTS_DIR = Path("data/results/long_term")
+INDEX_FIELDS = ("asset", "name", "symbol", "market_type", "verdict", "band", "summary_line", "composite", "confidence")
 REPORT_DIR.mkdir(exist_ok=True)
 
-COINGECKO = "https://api.coingecko.com/api/v3"
 YAHOO_SUMMARY = "https://query2.finance.yahoo.com/v10/finance/quoteSummary"
 YAHOO_CHART = "https://query1.finance.yahoo.com/v8/finance/chart"
 YAHOO_QUOTE = "https://query1.finance.yahoo.com/v7/finance/quote"
 ALPHA_OVERVIEW = "https://www.alphavantage.co/query"
-STOOQ_SYMBOLS = {
-    "spy": "spy.us",
-    "qqq": "qqq.us",
-    "nvda": "nvda.us",
-    "gold": "xauusd",
-    "oil": "cl.f",
-}
-
-CRYPTO_ASSETS = {
-    "bitcoin": {
-        "name": "Bitcoin",
-        "symbol": "BTC",
-        "thesis": "Digital monetary network with fixed-supply narrative and highest liquidity depth in crypto.",
-        "narrative": "Store-of-value and collateral asset in crypto market structure.",
-    },
-    "ethereum": {
-        "name": "Ethereum",
-        "symbol": "ETH",
-        "thesis": "Programmable settlement layer where utility depends on smart-contract activity and fee demand.",
-        "narrative": "Compute and settlement network for on-chain applications.",
-    },
-}
-
-TRADITIONAL_ASSETS = {
-    "spy": {
-        "name": "S&P 500 ETF",
-        "symbol": "SPY",
-        "asset_type": "etf",
-        "macro_note": "High sensitivity to U.S. growth, real rates, and broad equity risk appetite.",
-    },
-    "qqq": {
-        "name": "Nasdaq 100 ETF",
-        "symbol": "QQQ",
-        "asset_type": "etf",
-        "macro_note": "Higher duration/growth sensitivity and concentration in mega-cap technology.",
-    },
-    "nvda": {
-        "name": "NVIDIA",
-        "symbol": "NVDA",
-        "asset_type": "equity",
-        "macro_note": "Cyclical semiconductor exposure with AI capex dependence and valuation sensitivity to rates.",
-    },
-    "gold": {
-        "name": "Gold Futures",
-        "symbol": "GC=F",
-        "asset_type": "commodity",
-        "macro_note": "Sensitive to real yields, USD direction, and geopolitical hedging demand.",
-    },
-    "oil": {
-        "name": "Crude Oil Futures",
-        "symbol": "CL=F",
-        "asset_type": "commodity",
-        "macro_note": "Driven by global growth, OPEC+ policy, inventories, and geopolitical supply shocks.",
-    },
-}
+# Fetch sources that count as current data: fresh cache hits are within their
+# TTL and revalidated entries were confirmed unchanged by the server.
+LIVE_SOURCES = ("live", "cache-fresh", "revalidated")
 
 
 def clamp(value, low=0.0, high=100.0):
@@ -86,6 +47,12 @@ def safe_div(a, b):
         return None
 
 
+def mean_present(values):
+    """Mean of the values that are not NaN, or None when there are none."""
+    present = [value for value in values if value == value]
+    return statistics.mean(present) if present else None
+
+
 def to_float(value):
     if isinstance(value, dict):
         value = value.get("raw", value.get("fmt"))
@@ -105,11 +72,6 @@ def normalize_fraction(value):
     return value
 
 
-def mean_or_none(values):
-    clean = [v for v in values if v is not None]
-    return statistics.mean(clean) if clean else None
-
-
 def first_not_none(*values):
     for value in values:
         if value is not None:
@@ -135,100 +97,6 @@ def fmt_pct(value, digits=2):
     return f"{sign}{value:.{digits}f}%"
 
 
-def percentile_rank(series, value):
-    if not series or value is None:
-        return None
-    ordered = sorted(series)
-    count = sum(1 for item in ordered if item <= value)
-    return 100.0 * count / len(ordered)
-
-
-def score_threshold(value, good, bad, higher_is_better=True):
-    if value is None:
-        return None
-
-    if higher_is_better:
-        if value >= good:
-            return 100.0
-        if value <= bad:
-            return 0.0
-        return 100.0 * (value - bad) / (good - bad)
-
-    if value <= good:
-        return 100.0
-    if value >= bad:
-        return 0.0
-    return 100.0 * (bad - value) / (bad - good)
-
-
-def weighted_score(score_map, weights):
-    total = 0.0
-    used = 0.0
-    for key, weight in weights.items():
-        score = score_map.get(key)
-        if score is None:
-            continue
-        total += score * weight
-        used += weight
-    if used == 0:
-        return None, 0.0
-    return total / used, used
-
-
-def annualized_volatility(prices):
-    if not prices or len(prices) < 20:
-        return None
-    returns = []
-    for idx in range(1, len(prices)):
-        prev = prices[idx - 1]
-        curr = prices[idx]
-        if prev and curr:
-            returns.append(curr / prev - 1)
-    if len(returns) < 20:
-        return None
-    return statistics.pstdev(returns) * math.sqrt(252) * 100.0
-
-
-def max_drawdown(prices):
-    if not prices:
-        return None
-    peak = prices[0]
-    worst = 0.0
-    for price in prices:
-        peak = max(peak, price)
-        if peak:
-            dd = (price / peak - 1.0) * 100.0
-            worst = min(worst, dd)
-    return worst
-
-
-def recovery_days_after_drawdown(prices):
-    if not prices or len(prices) < 3:
-        return None
-    peak = prices[0]
-    peak_idx = 0
-    trough_idx = 0
-    trough_price = prices[0]
-
-    for idx, price in enumerate(prices):
-        if price > peak:
-            peak = price
-            peak_idx = idx
-            trough_idx = idx
-            trough_price = price
-        if price < trough_price:
-            trough_price = price
-            trough_idx = idx
-
-    if trough_idx <= peak_idx:
-        return None
-
-    for idx in range(trough_idx, len(prices)):
-        if prices[idx] >= peak:
-            return idx - trough_idx
-    return None
-
-
 def label_from_score(score):
     if score is None:
         return "Insufficient data"
@@ -333,9 +201,11 @@ def confidence_score(used_weight, data_points, source_labels):
     coverage = clamp(used_weight)
     sample = clamp(data_points / 365.0 * 100.0)
 
-    if all(src == "live" for src in source_labels):
+    if all(src in LIVE_SOURCES for src in source_labels):
         freshness = 100.0
-    elif any(src == "live" for src in source_labels):
+    elif all(src in LIVE_SOURCES or src == "stale" for src in source_labels):
+        freshness = 85.0
+    elif any(src in LIVE_SOURCES for src in source_labels):
         freshness = 75.0
     elif all(src == "cache" for src in source_labels):
         freshness = 55.0
@@ -345,20 +215,17 @@ def confidence_score(used_weight, data_points, source_labels):
     return round(0.45 * coverage + 0.30 * freshness + 0.25 * sample, 1)
 
 
-def quantile(series, q):
-    if not series:
-        return None
-    ordered = sorted(series)
-    idx = int((len(ordered) - 1) * q)
-    return ordered[idx]
-
+def build_scenarios(current_price, history, quantiles=None):
+    """Bear/base/bull targets at the 20th/50th/80th percentile of history.
 
-def build_scenarios(current_price, history):
-    if current_price is None or not history:
+    Pass the "quantiles" of an existing price_stats() result to skip sorting
+    the history again.
+    """
+    if current_price is None or len(history) == 0:
         return None
-    p20 = quantile(history, 0.2)
-    p50 = quantile(history, 0.5)
-    p80 = quantile(history, 0.8)
+    if quantiles is None:
+        quantiles = price_stats(history)["quantiles"]
+    p20, p50, p80 = (quantiles.get(q) for q in SCENARIO_QUANTILES)
     if None in (p20, p50, p80):
         return None
 
@@ -381,25 +248,6 @@ def build_scenarios(current_price, history):
     }
 
 
-def get_crypto_history(asset, days=365):
-    try:
-        url = f"{COINGECKO}/coins/{asset}/market_chart"
-        payload, source = fetch_json_with_cache(
-            url,
-            params={"vs_currency": "usd", "days": days},
-            namespace="coingecko_market_chart",
-            cache_key=f"{asset}_usd_{days}",
-            retries=5,
-        )
-    except Exception:
-        return [], [], [], "unavailable"
-
-    prices = [row[1] for row in payload.get("prices", []) if isinstance(row[1], (int, float))]
-    market_caps = [row[1] for row in payload.get("market_caps", []) if isinstance(row[1], (int, float))]
-    volumes = [row[1] for row in payload.get("total_volumes", []) if isinstance(row[1], (int, float))]
-    return prices, market_caps, volumes, source
-
-
 def get_crypto_details(asset):
     try:
         url = f"{COINGECKO}/coins/{asset}"
@@ -414,7 +262,6 @@ def get_crypto_details(asset):
                 "sparkline": "false",
             },
             namespace="coingecko_coin",
-            cache_key=f"coin_{asset}",
             retries=5,
         )
         return payload, source
@@ -430,7 +277,6 @@ def get_yahoo_summary(symbol):
                 "modules": "price,summaryDetail,defaultKeyStatistics,financialData,assetProfile",
             },
             namespace="yahoo_summary",
-            cache_key=f"summary_{symbol}",
             retries=4,
         )
         result = (payload.get("quoteSummary", {}).get("result") or [{}])[0]
@@ -446,7 +292,6 @@ def get_yahoo_quote(symbol):
             YAHOO_QUOTE,
             params={"symbols": symbol},
             namespace="yahoo_quote_single",
-            cache_key=f"quote_single_{symbol}",
             retries=4,
         )
         rows = payload.get("quoteResponse", {}).get("result", [])
@@ -467,7 +312,6 @@ def get_alpha_overview(symbol):
             ALPHA_OVERVIEW,
             params={"function": "OVERVIEW", "symbol": symbol, "apikey": api_key},
             namespace="alpha_overview",
-            cache_key=f"alpha_overview_{symbol}",
             retries=3,
         )
         if payload.get("Note") or payload.get("Information"):
@@ -486,50 +330,90 @@ def parse_float(text):
         return None
 
 
-def get_stooq_history(asset_id):
-    symbol = STOOQ_SYMBOLS.get(asset_id)
+def get_stooq_history(symbol):
+    """Monthly closes from Stooq, fetched from the newest stored month on."""
     if not symbol:
         return [], "unavailable"
 
+    since = last_timestamp("stooq_monthly", symbol)
     try:
         url = f"https://stooq.com/q/d/l/?s={symbol}&i=m"
+        if since is not None:
+            url += f"&d1={datetime.fromtimestamp(since, UTC).strftime('%Y%m%d')}"
         text, source = fetch_text_with_cache(
             url,
             namespace="stooq_history",
-            cache_key=f"stooq_hist_{symbol}",
             retries=3,
         )
-        reader = csv.DictReader(io.StringIO(text))
-        prices = []
-        for row in reader:
+        rows = {column: [] for column in ("timestamp", "open", "high", "low", "close", "volume")}
+        for row in csv.DictReader(io.StringIO(text)):
             close = parse_float(row.get("Close"))
-            if close is not None:
-                prices.append(close)
-        return prices, f"stooq_{source}"
+            try:
+                day = datetime.strptime(row.get("Date") or "", "%Y-%m-%d").replace(tzinfo=UTC)
+            except ValueError:
+                continue
+            if close is None:
+                continue
+            rows["timestamp"].append(day.timestamp())
+            rows["close"].append(close)
+            for column in ("open", "high", "low", "volume"):
+                value = parse_float(row.get(column.title()))
+                rows[column].append(math.nan if value is None else value)
+        # One bar per month; the stored, possibly still forming month is refetched.
+        append_rows("stooq_monthly", symbol, last_per_month(rows), None if since is None else month_start(since))
     except Exception:
-        return [], "unavailable"
-def get_yahoo_history(symbol):
+        if since is None:
+            return [], "unavailable"
+        source = "cache"
+    (prices,) = stored_history("stooq_monthly", symbol, ("close",))
+    return prices, f"stooq_{source}"
+
+
+def get_yahoo_history(symbol, years=10):
+    """Monthly closes for the last `years` years, fetched from the newest stored month on."""
+    since = last_timestamp("yahoo_monthly", symbol)
     try:
+        url = f"{YAHOO_CHART}/{symbol}"
+        if since is None:
+            params = {"range": f"{years}y", "interval": "1mo"}
+            cache_key = None
+        else:
+            params = {"period1": int(since), "period2": int(time.time()), "interval": "1mo"}
+            cache_key = canonical_request_key(url, {"period1": int(since), "interval": "1mo"})
         payload, source = fetch_json_with_cache(
-            f"{YAHOO_CHART}/{symbol}",
-            params={"range": "10y", "interval": "1mo"},
+            url,
+            params=params,
             namespace="yahoo_history",
-            cache_key=f"history_{symbol}_10y_1mo",
+            cache_key=cache_key,
             retries=4,
         )
 
         result = (payload.get("chart", {}).get("result") or [{}])[0]
-        close = ((result.get("indicators", {}).get("quote") or [{}])[0]).get("close") or []
-        prices = [float(x) for x in close if isinstance(x, (int, float))]
-        return prices, source
+        quote = (result.get("indicators", {}).get("quote") or [{}])[0]
+        rows = {column: [] for column in ("timestamp", "open", "high", "low", "close", "volume")}
+        for idx, ts in enumerate(result.get("timestamp") or []):
+            bar = {column: (quote.get(column) or [])[idx:idx + 1] for column in rows if column != "timestamp"}
+            close = bar["close"][0] if bar["close"] else None
+            if not isinstance(close, (int, float)) or not isinstance(ts, (int, float)):
+                continue
+            rows["timestamp"].append(float(ts))
+            for column, value in bar.items():
+                rows[column].append(float(value[0]) if value and isinstance(value[0], (int, float)) else math.nan)
+        append_rows("yahoo_monthly", symbol, last_per_month(rows), None if since is None else month_start(since))
     except Exception:
-        return [], "unavailable"
+        if since is None:
+            return [], "unavailable"
+        source = "cache"
+    (prices,) = stored_history("yahoo_monthly", symbol, ("close",))
+    # range=10y returns one bar per month plus the current month.
+    return prices[-(years * 12 + 1):], source
+
 
 def score_crypto(asset_id, meta):
     prices, market_caps, volumes, history_source = get_crypto_history(asset_id)
     details, details_source = get_crypto_details(asset_id)
 
-    current = prices[-1] if prices else None
+    current = prices[-1] if len(prices) else None
     ma200 = statistics.mean(prices[-200:]) if len(prices) >= 200 else None
     price_to_ma = safe_div(current, ma200)
 
@@ -552,66 +436,47 @@ def score_crypto(asset_id, meta):
     commit_4w = to_float(developer.get("commit_count_4_weeks"))
     stars = to_float(developer.get("stars"))
 
-    vol_30 = statistics.mean(volumes[-30:]) if len(volumes) >= 30 else None
-    vol_180 = statistics.mean(volumes[-180:]) if len(volumes) >= 180 else None
+    # Days without a recorded volume are left out of the averages.
+    vol_30 = mean_present(volumes[-30:]) if len(volumes) >= 30 else None
+    vol_180 = mean_present(volumes[-180:]) if len(volumes) >= 180 else None
     usage_growth_proxy = safe_div(vol_30, vol_180)
 
-    ann_vol = annualized_volatility(prices)
-    mdd = max_drawdown(prices)
-
-    price_percentile = percentile_rank(prices, current)
-
-    tokenomics_score = mean_or_none([
-        score_threshold(circulating_ratio, good=0.90, bad=0.45, higher_is_better=True),
-        score_threshold(fdv_ratio, good=1.15, bad=2.5, higher_is_better=False),
-        score_threshold(max_supply_ratio, good=0.80, bad=0.35, higher_is_better=True),
-    ])
-    network_score = mean_or_none([
-        score_threshold(usage_growth_proxy, good=1.15, bad=0.75, higher_is_better=True),
-        score_threshold(nvt_proxy, good=20, bad=140, higher_is_better=False),
-        score_threshold(turnover, good=0.08, bad=0.01, higher_is_better=True),
-    ])
-    dev_score = mean_or_none([
-        score_threshold(commit_4w, good=250, bad=25, higher_is_better=True),
-        score_threshold(stars, good=30000, bad=2000, higher_is_better=True),
-    ])
-    liquidity_score = mean_or_none([
-        score_threshold(turnover, good=0.10, bad=0.01, higher_is_better=True),
-        score_threshold(abs(mdd) if mdd is not None else None, good=25, bad=75, higher_is_better=False),
-    ])
-    macro_narrative_score = mean_or_none([
-        score_threshold(price_to_ma, good=1.05, bad=0.70, higher_is_better=True),
-        score_threshold(price_percentile, good=65, bad=20, higher_is_better=True),
-        score_threshold(abs(mdd) if mdd is not None else None, good=25, bad=80, higher_is_better=False),
-    ])
-
-    score_map = {
-        "tokenomics": tokenomics_score,
-        "usage": network_score,
-        "dev_security": dev_score,
-        "liquidity": liquidity_score,
-        "macro_narrative": macro_narrative_score,
-    }
-    weights = {
-        "tokenomics": 20,
-        "usage": 25,
-        "dev_security": 20,
-        "liquidity": 15,
-        "macro_narrative": 20,
+    stats = price_stats(prices, current)
+    ann_vol = stats["ann_vol"]
+    mdd = stats["max_drawdown"]
+    price_percentile = stats["percentile"]
+
+    metrics = {
+        "price": current,
+        "ma200": ma200,
+        "price_to_ma": price_to_ma,
+        "price_percentile": price_percentile,
+        "market_cap": market_cap,
+        "fdv": fdv,
+        "volume_24h": vol_24h,
+        "circulating_ratio": circulating_ratio,
+        "max_supply_ratio": max_supply_ratio,
+        "fdv_ratio": fdv_ratio,
+        "turnover": turnover,
+        "nvt_proxy": nvt_proxy,
+        "usage_growth_proxy": usage_growth_proxy,
+        "commit_4w": commit_4w,
+        "stars": stars,
+        "ann_vol": ann_vol,
+        "max_drawdown": mdd,
     }
-
-    composite, used_weight = weighted_score(score_map, weights)
+    score_map, weights, composite, used_weight = score_asset("crypto", metrics)
     confidence = confidence_score(used_weight, len(prices), [history_source, details_source])
     verdict = label_from_score(composite)
-    scenarios = build_scenarios(current, prices)
+    scenarios = build_scenarios(current, prices, stats["quantiles"])
 
     valuation_band = valuation_band_from_verdict(verdict, price_percentile)
-    summary_line = f"Long-term: {valuation_band.title()} - {growth_label(network_score)} - {risk_label(macro_narrative_score)}."
+    summary_line = f"Long-term: {valuation_band.title()} - {growth_label(score_map['usage'])} - {risk_label(score_map['macro_narrative'])}."
     tldr_pill = f"{band_emoji(valuation_band)} {valuation_band.title()} ({fmt_num(composite, 1)})"
     next_watch = pick_next_watch(score_map)
 
     lines = []
-    lines.append(f"## {meta['name']} ({meta['symbol']})")
+    lines.append(f"## {meta.heading}")
     lines.append("")
     lines.append(f"_Data sources: CoinGecko history ({history_source}), CoinGecko fundamentals ({details_source})_")
     lines.append("")
@@ -627,8 +492,8 @@ def score_crypto(asset_id, meta):
     lines.append("")
     lines.append("### Investment Thesis")
     lines.append("")
-    lines.append(f"- {meta['thesis']}")
-    lines.append(f"- {meta['narrative']}")
+    lines.append(f"- {meta.thesis}")
+    lines.append(f"- {meta.narrative}")
     lines.append("- Long-term edge depends on durable usage, not short-term price spikes.")
     lines.append("")
     lines.append("### Valuation Band")
@@ -642,11 +507,11 @@ def score_crypto(asset_id, meta):
     lines.append("|---|---:|")
     lines.append(f"| Composite | {fmt_num(composite, 1)} |")
     lines.append(f"| Confidence | {fmt_num(confidence, 1)} |")
-    lines.append(f"| Supply/issuance | {fmt_num(tokenomics_score, 1)} |")
-    lines.append(f"| Network usage | {fmt_num(network_score, 1)} |")
-    lines.append(f"| Dev & security | {fmt_num(dev_score, 1)} |")
-    lines.append(f"| Liquidity | {fmt_num(liquidity_score, 1)} |")
-    lines.append(f"| Macro/regulatory | {fmt_num(macro_narrative_score, 1)} |")
+    lines.append(f"| Supply/issuance | {fmt_num(score_map['tokenomics'], 1)} |")
+    lines.append(f"| Network usage | {fmt_num(score_map['usage'], 1)} |")
+    lines.append(f"| Dev & security | {fmt_num(score_map['dev_security'], 1)} |")
+    lines.append(f"| Liquidity | {fmt_num(score_map['liquidity'], 1)} |")
+    lines.append(f"| Macro/regulatory | {fmt_num(score_map['macro_narrative'], 1)} |")
     lines.append("")
     lines.append("### Key Drivers")
     lines.append("")
@@ -703,7 +568,23 @@ def score_crypto(asset_id, meta):
     lines.append("")
     lines.append("---")
 
-    return "\n".join(lines)
+    return {
+        "asset": asset_id,
+        "name": meta.name,
+        "symbol": meta.symbol,
+        "market_type": "crypto",
+        "verdict": verdict,
+        "band": valuation_band,
+        "summary_line": summary_line.removeprefix("Long-term: "),
+        "composite": composite,
+        "confidence": confidence,
+        "pillars": score_map,
+        "weights": weights,
+        "metrics": metrics,
+        "scenarios": scenarios,
+        "sources": {"history": history_source, "details": details_source},
+        "markdown": "\n".join(lines),
+    }
 
 
 def extract_module(summary, name):
@@ -711,14 +592,14 @@ def extract_module(summary, name):
 
 
 def score_traditional(asset_id, meta):
-    symbol = meta["symbol"]
+    symbol = meta.symbol
     summary, summary_source = get_yahoo_summary(symbol)
     quote_row, quote_source = get_yahoo_quote(symbol)
     alpha_overview, alpha_source = get_alpha_overview(symbol)
     prices, history_source = get_yahoo_history(symbol)
-    if not prices:
-        stooq_prices, stooq_source = get_stooq_history(asset_id)
-        if stooq_prices:
+    if not len(prices):
+        stooq_prices, stooq_source = get_stooq_history(meta.stooq)
+        if len(stooq_prices):
             prices = stooq_prices
             history_source = stooq_source
 
@@ -727,7 +608,7 @@ def score_traditional(asset_id, meta):
     stats_mod = extract_module(summary, "defaultKeyStatistics")
     fin_mod = extract_module(summary, "financialData")
 
-    current = first_not_none(to_float(price_mod.get("regularMarketPrice")), to_float(quote_row.get("regularMarketPrice")), prices[-1] if prices else None)
+    current = first_not_none(to_float(price_mod.get("regularMarketPrice")), to_float(quote_row.get("regularMarketPrice")), prices[-1] if len(prices) else None)
     market_cap = first_not_none(to_float(price_mod.get("marketCap")), to_float(quote_row.get("marketCap")), parse_float(alpha_overview.get("MarketCapitalization")))
 
     trailing_pe = first_not_none(to_float(stats_mod.get("trailingPE")), to_float(quote_row.get("trailingPE")), parse_float(alpha_overview.get("PERatio")))
@@ -762,80 +643,53 @@ def score_traditional(asset_id, meta):
     fcf_yield = safe_div(free_cashflow, market_cap)
     ma_24m = statistics.mean(prices[-24:]) if len(prices) >= 24 else None
     price_to_ma = safe_div(current, ma_24m)
-    price_percentile = percentile_rank(prices, current)
-    ann_vol = annualized_volatility(prices)
-    mdd = max_drawdown(prices)
-    scenarios = build_scenarios(current, prices)
-
-    asset_type = meta.get("asset_type")
-    if asset_type == "equity":
-        valuation_score = mean_or_none([
-            score_threshold(trailing_pe, good=16, bad=45, higher_is_better=False),
-            score_threshold(pb, good=3, bad=18, higher_is_better=False),
-            score_threshold(peg, good=1.4, bad=3.0, higher_is_better=False),
-            score_threshold(price_percentile, good=55, bad=90, higher_is_better=False),
-        ])
-        growth_profit_score = mean_or_none([
-            score_threshold((rev_growth or 0) * 100 if rev_growth is not None else None, good=12, bad=-5, higher_is_better=True),
-            score_threshold((eps_growth or 0) * 100 if eps_growth is not None else None, good=15, bad=-8, higher_is_better=True),
-            score_threshold((gross_margin or 0) * 100 if gross_margin is not None else None, good=45, bad=20, higher_is_better=True),
-            score_threshold((net_margin or 0) * 100 if net_margin is not None else None, good=18, bad=4, higher_is_better=True),
-        ])
-    elif asset_type == "etf":
-        valuation_score = mean_or_none([
-            score_threshold(price_percentile, good=50, bad=90, higher_is_better=False),
-            score_threshold((expense_ratio or 0) * 100 if expense_ratio is not None else None, good=0.10, bad=0.95, higher_is_better=False),
-            score_threshold((dividend_yield or 0) * 100 if dividend_yield is not None else None, good=1.5, bad=0.0, higher_is_better=True),
-        ])
-        growth_profit_score = mean_or_none([
-            score_threshold(price_to_ma, good=1.05, bad=0.80, higher_is_better=True),
-            score_threshold((dividend_yield or 0) * 100 if dividend_yield is not None else None, good=2.0, bad=0.0, higher_is_better=True),
-        ])
-    else:
-        valuation_score = mean_or_none([
-            score_threshold(price_percentile, good=45, bad=90, higher_is_better=False),
-            score_threshold(price_to_ma, good=1.00, bad=1.35, higher_is_better=False),
-        ])
-        growth_profit_score = mean_or_none([
-            score_threshold(price_to_ma, good=1.08, bad=0.80, higher_is_better=True),
-        ])
-
-    balance_cashflow_score = mean_or_none([
-        score_threshold(debt_to_equity, good=40, bad=220, higher_is_better=False),
-        score_threshold(current_ratio, good=1.8, bad=0.8, higher_is_better=True),
-        score_threshold((fcf_yield or 0) * 100 if fcf_yield is not None else None, good=8, bad=0, higher_is_better=True),
-        score_threshold((payout_ratio or 0) * 100 if payout_ratio is not None else None, good=45, bad=120, higher_is_better=False),
-    ])
-    comp_mgmt_score = mean_or_none([
-        score_threshold((roe or 0) * 100 if roe is not None else None, good=18, bad=6, higher_is_better=True),
-        score_threshold((insider or 0) * 100 if insider is not None else None, good=8, bad=0.2, higher_is_better=True),
-        score_threshold((institution or 0) * 100 if institution is not None else None, good=75, bad=20, higher_is_better=True),
-    ])
-    macro_reg_score = mean_or_none([
-        score_threshold(beta, good=0.9, bad=1.8, higher_is_better=False),
-        score_threshold(abs(mdd) if mdd is not None else None, good=20, bad=60, higher_is_better=False),
-        score_threshold(abs(ann_vol) if ann_vol is not None else None, good=12, bad=45, higher_is_better=False),
-    ])
-
-    score_map = {
-        "valuation": valuation_score,
-        "growth_profit": growth_profit_score,
-        "balance_cashflow": balance_cashflow_score,
-        "comp_mgmt": comp_mgmt_score,
-        "macro_reg": macro_reg_score,
+    stats = price_stats(prices, current)
+    price_percentile = stats["percentile"]
+    ann_vol = stats["ann_vol"]
+    mdd = stats["max_drawdown"]
+    scenarios = build_scenarios(current, prices, stats["quantiles"])
+
+    metrics = {
+        "price": current,
+        "market_cap": market_cap,
+        "trailing_pe": trailing_pe,
+        "forward_pe": forward_pe,
+        "price_to_book": pb,
+        "ev_ebitda": ev_ebitda,
+        "price_to_sales": ps,
+        "peg": peg,
+        "gross_margin": gross_margin,
+        "operating_margin": op_margin,
+        "net_margin": net_margin,
+        "roe": roe,
+        "revenue_growth": rev_growth,
+        "eps_growth": eps_growth,
+        "debt_to_equity": debt_to_equity,
+        "current_ratio": current_ratio,
+        "quick_ratio": quick_ratio,
+        "fcf_yield": fcf_yield,
+        "payout_ratio": payout_ratio,
+        "dividend_yield": dividend_yield,
+        "beta": beta,
+        "insider_ownership": insider,
+        "institutional_ownership": institution,
+        "expense_ratio": expense_ratio,
+        "price_to_ma": price_to_ma,
+        "price_percentile": price_percentile,
+        "ann_vol": ann_vol,
+        "max_drawdown": mdd,
     }
-    weights = {"valuation": 25, "growth_profit": 25, "balance_cashflow": 20, "comp_mgmt": 15, "macro_reg": 15}
-
-    composite, used_weight = weighted_score(score_map, weights)
+    asset_type = meta.asset_type
+    score_map, weights, composite, used_weight = score_asset(rubric_name("traditional", asset_type), metrics)
     confidence = confidence_score(used_weight, len(prices) * 21, [summary_source, quote_source, alpha_source, history_source])
     verdict = label_from_score(composite)
     valuation_band = valuation_band_from_verdict(verdict, price_percentile)
-    summary_line = f"Long-term: {valuation_band.title()} - {growth_label(growth_profit_score)} - {risk_label(macro_reg_score)}."
+    summary_line = f"Long-term: {valuation_band.title()} - {growth_label(score_map['growth_profit'])} - {risk_label(score_map['macro_reg'])}."
     tldr_pill = f"{band_emoji(valuation_band)} {valuation_band.title()} ({fmt_num(composite, 1)})"
     next_watch = pick_next_watch(score_map)
 
     lines = []
-    lines.append(f"## {meta['name']} ({symbol})")
+    lines.append(f"## {meta.heading}")
     lines.append("")
     lines.append(f"_Data sources: Yahoo summary ({summary_source}), Yahoo quote ({quote_source}), Alpha overview ({alpha_source}), Price history ({history_source})_")
     lines.append("")
@@ -851,7 +705,7 @@ def score_traditional(asset_id, meta):
     lines.append("")
     lines.append("### Investment Thesis")
     lines.append("")
-    lines.append(f"- {meta['macro_note']}")
+    lines.append(f"- {meta.macro_note}")
     lines.append("- Long-term returns depend more on entry valuation and cycle path than daily news.")
     lines.append("- Focus on downside control first, upside second.")
     lines.append("")
@@ -866,11 +720,11 @@ def score_traditional(asset_id, meta):
     lines.append("|---|---:|")
     lines.append(f"| Composite | {fmt_num(composite, 1)} |")
     lines.append(f"| Confidence | {fmt_num(confidence, 1)} |")
-    lines.append(f"| Valuation | {fmt_num(valuation_score, 1)} |")
-    lines.append(f"| Growth & profitability | {fmt_num(growth_profit_score, 1)} |")
-    lines.append(f"| Balance sheet & cash flow | {fmt_num(balance_cashflow_score, 1)} |")
-    lines.append(f"| Competitive position & management | {fmt_num(comp_mgmt_score, 1)} |")
-    lines.append(f"| Macro/regulatory | {fmt_num(macro_reg_score, 1)} |")
+    lines.append(f"| Valuation | {fmt_num(score_map['valuation'], 1)} |")
+    lines.append(f"| Growth & profitability | {fmt_num(score_map['growth_profit'], 1)} |")
+    lines.append(f"| Balance sheet & cash flow | {fmt_num(score_map['balance_cashflow'], 1)} |")
+    lines.append(f"| Competitive position & management | {fmt_num(score_map['comp_mgmt'], 1)} |")
+    lines.append(f"| Macro/regulatory | {fmt_num(score_map['macro_reg'], 1)} |")
     lines.append("")
     lines.append("### Key Drivers")
     lines.append("")
@@ -927,10 +781,72 @@ def score_traditional(asset_id, meta):
     lines.append("")
     lines.append("---")
 
-    return "\n".join(lines)
+    return {
+        "asset": asset_id,
+        "name": meta.name,
+        "symbol": symbol,
+        "market_type": "traditional",
+        "asset_type": asset_type,
+        "verdict": verdict,
+        "band": valuation_band,
+        "summary_line": summary_line.removeprefix("Long-term: "),
+        "composite": composite,
+        "confidence": confidence,
+        "pillars": score_map,
+        "weights": weights,
+        "metrics": metrics,
+        "scenarios": scenarios,
+        "sources": {
+            "summary": summary_source,
+            "quote": quote_source,
+            "alpha": alpha_source,
+            "history": history_source,
+        },
+        "markdown": "\n".join(lines),
+    }
+
+
+def save_asset_shard(result):
+    """Write one asset's report section and results; returns its index row."""
+    asset_id = result["asset"]
+    write_if_changed(SHARD_DIR / f"{asset_id}.md", result["markdown"])
+    write_if_changed(RESULTS_DIR / f"{asset_id}.json", json.dumps(result, indent=2))
+    return {**{field: result.get(field) for field in INDEX_FIELDS}, "report": f"{asset_id}.md"}
+
+
+def score_and_save(score, asset_id, meta):
+    return save_asset_shard(score(asset_id, meta))
+
+
+async def score_all_assets():
+    """Score every asset concurrently, writing each shard as soon as it is scored.
+
+    Per-host limits live in api_utils. Returns the index rows, not the full
+    results, so memory does not grow with the report size.
+    """
+    jobs = []
+    for asset in assets("long_term"):
+        score = score_crypto if asset.market_type == "crypto" else score_traditional
+        jobs.append(asyncio.to_thread(score_and_save, score, asset.id, asset))
+    return await asyncio.gather(*jobs)
+
+
+def prune_shards(asset_ids):
+    """Drop shards of assets that are no longer scored."""
+    for directory, suffix in ((SHARD_DIR, ".md"), (RESULTS_DIR, ".json")):
+        if not directory.exists():
+            continue
+        for path in directory.glob(f"*{suffix}"):
+            if path.stem != "index" and path.stem not in asset_ids:
+                path.unlink()
 
 
 def generate_report():
+    """Score all assets into per-asset shards plus an index; returns the results index.
+
+    Writes reports/long_term/<asset>.md, data/results/long_term/<asset>.json
+    and an index.md / index.json next to them.
+    """
     report = []
     report.append("# Long-Term Multi-Asset Analysis Report")
     report.append("")
@@ -941,34 +857,57 @@ def generate_report():
     report.append("This report scores assets with a weighted, percentile-oriented rubric and pairs it with qualitative risk context.")
     report.append("Scoring is normalized to 0-100, then mapped to human labels and a confidence score based on coverage and data freshness.")
     report.append("")
+    crypto_weights = RUBRICS["crypto"]["weights"]
+    traditional_weights = RUBRICS["traditional"]["weights"]
     report.append("### Crypto Weights")
     report.append("")
-    report.append("- Supply/issuance & tokenomics: 20%")
-    report.append("- Network usage activity: 25%")
-    report.append("- Developer & security: 20%")
-    report.append("- Liquidity & market structure: 15%")
-    report.append("- Macro/regulatory & narrative: 20%")
+    report.append(f"- Supply/issuance & tokenomics: {crypto_weights['tokenomics']}%")
+    report.append(f"- Network usage activity: {crypto_weights['usage']}%")
+    report.append(f"- Developer & security: {crypto_weights['dev_security']}%")
+    report.append(f"- Liquidity & market structure: {crypto_weights['liquidity']}%")
+    report.append(f"- Macro/regulatory & narrative: {crypto_weights['macro_narrative']}%")
     report.append("")
     report.append("### Traditional Asset Weights")
     report.append("")
-    report.append("- Valuation: 25%")
-    report.append("- Growth & profitability: 25%")
-    report.append("- Balance sheet & cash flow: 20%")
-    report.append("- Competitive position & management: 15%")
-    report.append("- Macro/regulatory: 15%")
+    report.append(f"- Valuation: {traditional_weights['valuation']}%")
+    report.append(f"- Growth & profitability: {traditional_weights['growth_profit']}%")
+    report.append(f"- Balance sheet & cash flow: {traditional_weights['balance_cashflow']}%")
+    report.append(f"- Competitive position & management: {traditional_weights['comp_mgmt']}%")
+    report.append(f"- Macro/regulatory: {traditional_weights['macro_reg']}%")
     report.append("")
     report.append("---")
     report.append("")
 
-    for asset_id, meta in CRYPTO_ASSETS.items():
-        report.append(score_crypto(asset_id, meta))
+    rows = asyncio.run(score_all_assets())
+    prune_shards({row["asset"] for row in rows})
 
-    for asset_id, meta in TRADITIONAL_ASSETS.items():
-        report.append(score_traditional(asset_id, meta))
+    header = "\n".join(report)
+    report.append("## Assets")
+    report.append("")
+    report.append("| Asset | Valuation band | Composite | Confidence | Verdict |")
+    report.append("|---|---|---:|---:|---|")
+    for row in rows:
+        report.append(
+            f"| [{row['name']} ({row['symbol']})]({row['report']}) | {row['band']} | "
+            f"{fmt_num(row['composite'], 1)} | {fmt_num(row['confidence'], 1)} | {row['verdict']} |"
+        )
+    report.append("")
 
-    output = REPORT_DIR / "long_term_report.md"
-    output.write_text("\n".join(report), encoding="utf-8")
-    print("Long-term valuation report generated")
+    if write_if_changed(SHARD_DIR / "index.md", "\n".join(report)):
+        print("Long-term valuation report generated")
+    else:
+        print("Long-term valuation report unchanged")
+
+    first_section = header.find("\n## ")
+    # The run timestamp stays out of the results; "generated_at" carries it.
+    macro_markdown = TIMESTAMP_LINE.sub("", header[:first_section]) if first_section > 0 else ""
+    results = {
+        "generated_at": datetime.now(UTC).isoformat(),
+        "macro_markdown": re.sub(r"\n{3,}", "\n\n", macro_markdown).strip(),
+        "assets": {row["asset"]: row for row in rows},
+    }
+    write_if_changed(RESULTS_DIR / "index.json", json.dumps(results, indent=2))
+    return results
 
 
 if __name__ == "__main__":
@@ -1,41 +1,32 @@
-﻿import statistics
+﻿import json
+import statistics
 from datetime import UTC, datetime
 from pathlib import Path
 
-from api_utils import fetch_json_with_cache
+from build_manifest import write_if_changed
+from universe import assets
 
-ASSETS = {
-    "bitcoin": "Bitcoin (BTC)",
-    "ethereum": "Ethereum (ETH)",
-}
-
-VS_CURRENCY = "usd"
 DAYS = 30
-API_DELAY = 1.8
+# Read the same stored daily history as the long-term stage, so both stages
+# share its (incremental) CoinGecko fetch.
+HISTORY_SOURCE = "coingecko_daily"
 
 REPORT_DIR = Path("reports")
 REPORT_FILE = REPORT_DIR / "short_term.md"
+RESULTS_FILE = Path("data/results/short_term.json")
 
 
 def get_price_history(asset_id):
-    url = f"https://api.coingecko.com/api/v3/coins/{asset_id}/market_chart"
-    params = {
-        "vs_currency": VS_CURRENCY,
-        "days": DAYS,
-        "interval": "daily",
-    }
-    payload, source = fetch_json_with_cache(
-        url,
-        params=params,
-        namespace="coingecko_market_chart",
-        cache_key=f"{asset_id}_{VS_CURRENCY}_{DAYS}",
-        retries=5,
-    )
-    return payload, source
+    """Stored daily closes for the last year and their data source."""
+    from price_history import get_crypto_history
+
+    closes, _, _, source = get_crypto_history(asset_id)
+    return closes, source
 
 
-def analyze_short_term(prices):
-    values = [p[1] for p in prices]
+def analyze_short_term(closes):
+    """Signals recomputed from the last DAYS + 1 daily closes."""
+    values = [float(v) for v in closes]
 
     current = values[-1]
     price_7d = values[-8]
@@ -51,6 +42,15 @@ def analyze_short_term(prices):
 
     volatility = statistics.stdev(returns)
 
+    return short_term_signals(current, change_7d, change_30d, volatility)
+
+
+def analyze_state(state):
+    """Signals from an IndicatorState holding at least DAYS + 1 closes; O(1)."""
+    return short_term_signals(state.close(), state.change_pct(7), state.change_pct(DAYS), state.return_stdev())
+
+
+def short_term_signals(current, change_7d, change_30d, volatility):
     if change_30d > 5:
         trend = "UPTREND"
     elif change_30d < -5:
@@ -68,43 +68,72 @@ def analyze_short_term(prices):
         "trend": trend,
         "momentum": momentum,
         "volatility": vol_state,
+        "daily_vol_pct": volatility,
     }
 
 
 def generate_report():
+    """Write reports/short_term.md and data/results/short_term.json; returns the results."""
     REPORT_DIR.mkdir(exist_ok=True)
 
     lines = []
     now = datetime.now(UTC).strftime("%Y-%m-%d %H:%M UTC")
+    results = {"generated_at": datetime.now(UTC).isoformat(), "assets": {}}
 
     lines.append("# Short-Term Market Context\n")
     lines.append(f"_Generated automatically - {now}_\n")
 
-    for asset_id, name in ASSETS.items():
-        payload = None
+    for asset in assets("short_term"):
+        asset_id, name = asset.id, asset.heading
+        closes = []
         source = "none"
         try:
-            payload, source = get_price_history(asset_id)
+            closes, source = get_price_history(asset_id)
         except Exception:
-            payload = None
-
-        if not payload or "prices" not in payload:
-            lines.append(f"## {name}\n")
-            lines.append("Data unavailable due to API limits and no local cache.\n")
+            closes = []
+
+        section = [f"## {name}\n"]
+        # The 7-day change needs at least 8 closes.
+        if len(closes) < 8:
+            section.append("Data unavailable due to API limits and no local cache.\n")
+            lines.extend(section)
+            results["assets"][asset_id] = {
+                "name": name,
+                "available": False,
+                "source": None,
+                "markdown": "\n".join(section).strip(),
+            }
             continue
 
-        s = analyze_short_term(payload["prices"])
-
-        lines.append(f"## {name}\n")
-        lines.append(f"- **Current price:** ${s['current']:,.0f}")
-        lines.append(f"- **7D change:** {s['change_7d']:.2f}%")
-        lines.append(f"- **30D change:** {s['change_30d']:.2f}%")
-        lines.append(f"- **Trend:** **{s['trend']}**")
-        lines.append(f"- **Momentum:** **{s['momentum']}**")
-        lines.append(f"- **Volatility:** **{s['volatility']}**")
-        lines.append(f"- **Data source:** {source}\n")
-
-    REPORT_FILE.write_text("\n".join(lines), encoding="utf-8")
+        # The saved indicator state only takes in the bars stored since the
+        # last run; a short history is recomputed in full.
+        from indicators import update_from_store
+
+        state = update_from_store(HISTORY_SOURCE, asset_id, vol_window=DAYS)
+        if state.count > DAYS:
+            s = analyze_state(state)
+        else:
+            s = analyze_short_term(closes[-(DAYS + 1):])
+
+        section.append(f"- **Current price:** ${s['current']:,.0f}")
+        section.append(f"- **7D change:** {s['change_7d']:.2f}%")
+        section.append(f"- **30D change:** {s['change_30d']:.2f}%")
+        section.append(f"- **Trend:** **{s['trend']}**")
+        section.append(f"- **Momentum:** **{s['momentum']}**")
+        section.append(f"- **Volatility:** **{s['volatility']}**")
+        section.append(f"- **Data source:** {source}\n")
+        lines.extend(section)
+        results["assets"][asset_id] = {
+            "name": name,
+            "available": True,
+            "source": source,
+            **s,
+            "markdown": "\n".join(section).strip(),
+        }
+
+    write_if_changed(REPORT_FILE, "\n".join(lines))
+    write_if_changed(RESULTS_FILE, json.dumps(results, indent=2))
+    return results
 
 
 if __name__ == "__main__":
@@ -1,119 +1,662 @@
-import hashlib
+import contextvars
 import json
+import os
 import random
+import threading
 import time
-from pathlib import Path
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 
 import requests
 
-CACHE_DIR = Path("data/cache")
-CACHE_DIR.mkdir(parents=True, exist_ok=True)
+from cache_manager import CACHE_DIR, has_entry, read_entry, read_meta, update_meta, write_entry
+from cassette import ReplayAdapter, make_adapter
+from fetch_metrics import record_fetch
 
+try:
+    import fcntl
+except ImportError:  # Windows: buckets are only shared between threads
+    fcntl = None
 
-def _cache_path(namespace: str, key: str) -> Path:
-    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:20]
-    return CACHE_DIR / f"{namespace}_{digest}.json"
+RATE_LIMIT_DIR = CACHE_DIR / "ratelimit"
 
+# Number of per-host connection pools kept alive, and connections per pool.
+POOL_CONNECTIONS = int(os.getenv("API_POOL_CONNECTIONS", "16"))
+POOL_MAXSIZE = int(os.getenv("API_POOL_MAXSIZE", "8"))
 
-def fetch_json_with_cache(
-    url: str,
-    *,
-    params=None,
-    namespace: str,
-    cache_key: str,
-    retries: int = 5,
-    timeout: int = 20,
-    min_wait: float = 1.5,
-):
-    """Fetch JSON with backoff and cache fallback.
+# Upper bound on simultaneous in-flight requests per upstream host.
+HOST_CONCURRENCY = {
+    "api.coingecko.com": 2,
+    "query1.finance.yahoo.com": 4,
+    "query2.finance.yahoo.com": 4,
+    "stooq.com": 2,
+}
+DEFAULT_HOST_CONCURRENCY = 4
 
-    Returns (payload, source) where source is "live" or "cache".
-    Raises RuntimeError when both live and cache fail.
-    """
-    cache_file = _cache_path(namespace, cache_key)
+# Token bucket per upstream host as (requests per second, burst size).
+# Bucket state lives under RATE_LIMIT_DIR so every process on the machine
+# draws from the same budget. Hosts not listed here are not paced, and
+# neither is any host while responses are replayed from cassettes.
+HOST_RATE_LIMITS = {
+    "api.coingecko.com": (0.4, 3),
+    "query1.finance.yahoo.com": (2.0, 5),
+    "query2.finance.yahoo.com": (2.0, 5),
+    "stooq.com": (1.0, 3),
+    "www.alphavantage.co": (0.08, 1),
+}
+
+# Seconds a cached payload is served without touching the network.
+# Namespaces not listed here always go to the network first.
+CACHE_TTLS = {
+    "coingecko_coin": 12 * 3600,
+    "coingecko_market_chart": 3600,
+    "yahoo_summary": 12 * 3600,
+    "yahoo_history": 12 * 3600,
+    "stooq_history": 12 * 3600,
+    "alpha_overview": 24 * 3600,
+    "news_feed": 300,
+    "yahoo_quote": 60,
+    "yahoo_quote_single": 60,
+    "yahoo_chart": 60,
+    "stooq_quote": 60,
+}
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def _build_session(pool_connections, pool_maxsize):
+    adapter = make_adapter(pool_connections, pool_maxsize)
     session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def configure_session(pool_connections=None, pool_maxsize=None):
+    """Replace the shared session with one using the given pool sizes."""
+    global _session
+    session = _build_session(pool_connections or POOL_CONNECTIONS, pool_maxsize or POOL_MAXSIZE)
+    with _session_lock:
+        old, _session = _session, session
+    if old is not None:
+        old.close()
+    return session
+
+
+def get_session():
+    """Return the process-wide keep-alive session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session(POOL_CONNECTIONS, POOL_MAXSIZE)
+    return _session
+
+
+_host_semaphores = {}
+_host_lock = threading.Lock()
+
+
+def _host_semaphore(host):
+    with _host_lock:
+        semaphore = _host_semaphores.get(host)
+        if semaphore is None:
+            limit = HOST_CONCURRENCY.get(host, DEFAULT_HOST_CONCURRENCY)
+            semaphore = _host_semaphores[host] = threading.BoundedSemaphore(limit)
+        return semaphore
+
+
+# 4xx statuses worth retrying; any other 4xx fails straight to the cache.
+RETRYABLE_STATUSES = {408, 425, 429}
+
+# A host's circuit opens after this many consecutive connection errors,
+# timeouts or 5xx responses. While open, fetches skip the network and go
+# straight to the cache. After the cooldown the circuit is half-open: one
+# request probes the host while every other one keeps using the cache, until
+# the probe's outcome closes the circuit or opens it for another cooldown.
+BREAKER_THRESHOLD = int(os.getenv("API_BREAKER_THRESHOLD", "3"))
+BREAKER_COOLDOWN = float(os.getenv("API_BREAKER_COOLDOWN", "120"))
+
+# Longest Retry-After we honor; servers can ask for any value.
+MAX_RETRY_AFTER = float(os.getenv("API_MAX_RETRY_AFTER", "60"))
+
+# Wall-clock deadline for fetching, set by fetch_deadline() for a block of
+# code; pipeline.py opens one per run from API_FETCH_BUDGET.
+_deadline = contextvars.ContextVar("fetch_deadline", default=None)
+
+# Set by track_cache_reads() to collect the cache entries a block of code used.
+_cache_reads = contextvars.ContextVar("cache_reads", default=None)
+
+# Stale-while-revalidate: when enabled (per call, or for the whole process
+# with API_STALE_WHILE_REVALIDATE=1), an entry past its TTL but within
+# STALE_GRACE more seconds is returned at once as source "stale" while a
+# worker thread refreshes it.
+STALE_WHILE_REVALIDATE = os.getenv("API_STALE_WHILE_REVALIDATE", "") == "1"
+STALE_GRACE = float(os.getenv("API_STALE_GRACE", str(24 * 3600)))
+
+# Query parameters that do not change the response (credentials) and are
+# left out of cache keys so they never end up in cache metadata.
+IGNORED_KEY_PARAMS = {"apikey"}
+
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+_breakers = {}
+_breaker_lock = threading.Lock()
+
+_refresh_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="cache-refresh")
+_refreshing = set()
+_refresh_lock = threading.Lock()
+
+
+def canonical_request_key(url, params=None):
+    """Identify a request by URL plus sorted query params, whichever way they were passed."""
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    query += [(str(key), str(value)) for key, value in (params or {}).items() if value is not None]
+    query = sorted((key, value) for key, value in query if key.lower() not in IGNORED_KEY_PARAMS)
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or "/", urlencode(query), ""))
+
+
+@contextmanager
+def fetch_deadline(seconds):
+    """Finish all fetching inside the block within `seconds` of wall-clock time.
+
+    Request timeouts, backoff sleeps and rate-limit waits are cut to the
+    remaining budget; once it is spent, fetches fall back to the cache.
+    Nested deadlines can only shorten the budget. Worker threads started
+    through asyncio.to_thread (fetch_batch) inherit it.
+    """
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    if current is not None:
+        deadline = min(deadline, current)
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+@contextmanager
+def track_cache_reads():
+    """Collect every cache entry fetched inside the block.
+
+    Yields a list of [namespace, cache_key, version, ttl] rows, where version
+    is the entry's ETag or fetch time when it was read. Feed the rows to
+    cache_reads_current() later to see whether a rerun would read the same data.
+    """
+    reads = {}
+    rows = []
+    token = _cache_reads.set(reads)
+    try:
+        yield rows
+    finally:
+        _cache_reads.reset(token)
+        rows.extend([namespace, cache_key, version, ttl] for (namespace, cache_key), (version, ttl) in sorted(reads.items()))
+
+
+def _entry_version(meta):
+    if not meta:
+        return None
+    return meta.get("etag") or meta.get("last_modified") or meta.get("fetched_at")
+
+
+def cache_reads_current(rows):
+    """True when every tracked entry is still fresh and has not been refetched since."""
+    for namespace, cache_key, version, ttl in rows:
+        meta = read_meta(namespace, cache_key)
+        if version is None or _entry_version(meta) != version or not _is_fresh(meta, ttl):
+            return False
+    return True
+
+
+def remaining_budget():
+    """Seconds left before the active fetch deadline, or None when unbounded."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+
+def _circuit_open(host):
+    """True when this thread must not call the host. Past the cooldown, the
+    first caller becomes the probe and sees the circuit closed."""
+    with _breaker_lock:
+        state = _breakers.get(host)
+        if not state or state["failures"] < BREAKER_THRESHOLD:
+            return False
+        if time.time() - state["opened_at"] < BREAKER_COOLDOWN:
+            return True
+        if state["probe"] is None:
+            state["probe"] = threading.get_ident()
+        return state["probe"] != threading.get_ident()
+
+
+def _release_probe(host):
+    """Let another request probe the host when this thread's probe ended
+    without a success or failure (e.g. a 429 or 4xx)."""
+    with _breaker_lock:
+        state = _breakers.get(host)
+        if state and state["probe"] == threading.get_ident():
+            state["probe"] = None
+
+
+def _record_failure(host):
+    with _breaker_lock:
+        state = _breakers.setdefault(host, {"failures": 0, "opened_at": 0.0, "probe": None})
+        state["failures"] += 1
+        if state["failures"] >= BREAKER_THRESHOLD:
+            state["opened_at"] = time.time()
+            state["probe"] = None
+
+
+def _record_success(host):
+    with _breaker_lock:
+        _breakers.pop(host, None)
+
+
+def _single_flight(key, fetch):
+    """Run fetch once per key at a time; concurrent callers share its result."""
+    with _inflight_lock:
+        future = _inflight.get(key)
+        leader = future is None
+        if leader:
+            future = _inflight[key] = Future()
+    if not leader:
+        return future.result()
+
+    try:
+        result = fetch()
+    except BaseException as exc:
+        future.set_exception(exc)
+        raise
+    else:
+        future.set_result(result)
+        return result
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+
+_bucket_lock = threading.Lock()
+
+
+@contextmanager
+def _bucket_state(host):
+    RATE_LIMIT_DIR.mkdir(parents=True, exist_ok=True)
+    with _bucket_lock, open(RATE_LIMIT_DIR / f"{host}.json", "a+", encoding="utf-8") as handle:
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            handle.seek(0)
+            try:
+                state = json.loads(handle.read() or "{}")
+            except ValueError:
+                state = {}
+            yield state
+            handle.seek(0)
+            handle.truncate()
+            handle.write(json.dumps(state))
+            handle.flush()
+        finally:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def _acquire_token(host):
+    """Block until the host's shared token bucket allows one more request.
+
+    Returns False without waiting when the wait would overrun the fetch deadline.
+    """
+    limit = HOST_RATE_LIMITS.get(host)
+    if not limit:
+        return True
+    rate, burst = limit
+    while True:
+        with _bucket_state(host) as state:
+            now = time.time()
+            elapsed = max(0.0, now - state.get("updated", now))
+            tokens = min(float(burst), state.get("tokens", float(burst)) + elapsed * rate)
+            state["updated"] = now
+            if tokens >= 1.0:
+                state["tokens"] = tokens - 1.0
+                return True
+            state["tokens"] = tokens
+            wait = (1.0 - tokens) / rate
+        budget = remaining_budget()
+        if budget is not None and wait >= budget:
+            return False
+        time.sleep(wait)
+
+
+def _is_fresh(meta, ttl):
+    fetched_at = meta.get("fetched_at")
+    if not ttl or not isinstance(fetched_at, (int, float)):
+        return False
+    return time.time() - fetched_at < ttl
+
+
+def _conditional_headers(meta):
+    headers = {}
+    if meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+    return headers
+
+
+def _load_cached(namespace, cache_key, load):
+    text = read_entry(namespace, cache_key)
+    if text is None:
+        return None
+    try:
+        return load(text)
+    except ValueError:
+        return None
+
+
+def _fetch_with_cache(url, *, namespace, cache_key, ttl, stale_while_revalidate, stale_grace, **options):
+    if cache_key is None:
+        cache_key = canonical_request_key(url, options.get("params"))
+    if ttl is None:
+        ttl = CACHE_TTLS.get(namespace)
+
+    started_at = time.time()
+    started = time.perf_counter()
+    stats = {"leader": False, "attempts": 0, "sleep_s": 0.0, "rate_wait_s": 0.0, "ttfb_ms": None, "bytes": 0, "status": None}
+    outcome = "error"
+    try:
+        meta = read_meta(namespace, cache_key)
+        if _is_fresh(meta, ttl):
+            payload = _load_cached(namespace, cache_key, options["load"])
+            if payload is not None:
+                outcome = "cache-fresh"
+                return payload, outcome
+
+        if stale_while_revalidate is None:
+            stale_while_revalidate = STALE_WHILE_REVALIDATE
+        grace = STALE_GRACE if stale_grace is None else stale_grace
+        if stale_while_revalidate and _is_fresh(meta, (ttl or 0) + grace):
+            payload = _load_cached(namespace, cache_key, options["load"])
+            if payload is not None:
+                _schedule_refresh(url, namespace, cache_key, {"ttl": ttl, **options})
+                outcome = "stale"
+                return payload, outcome
+
+        payload, source = _single_flight(
+            (namespace, cache_key),
+            lambda: _fetch_uncoalesced(url, namespace=namespace, cache_key=cache_key, stats=stats, **options),
+        )
+        outcome = source if stats["leader"] else "coalesced"
+        return payload, source
+    except Exception as exc:
+        stats["error"] = str(exc)
+        raise
+    finally:
+        reads = _cache_reads.get()
+        if reads is not None:
+            reads[(namespace, cache_key)] = (_entry_version(read_meta(namespace, cache_key)), ttl)
+        record_fetch(
+            started_at=started_at,
+            host=urlsplit(url).hostname,
+            namespace=namespace,
+            key=cache_key,
+            outcome=outcome,
+            status=stats["status"],
+            attempts=stats["attempts"],
+            sleep_s=round(stats["sleep_s"], 3),
+            rate_wait_s=round(stats["rate_wait_s"], 3),
+            ttfb_ms=stats["ttfb_ms"],
+            elapsed_ms=round((time.perf_counter() - started) * 1000.0, 1),
+            bytes=stats["bytes"],
+            error=stats.get("error"),
+        )
+
+
+def _schedule_refresh(url, namespace, cache_key, options):
+    key = (namespace, cache_key)
+    with _refresh_lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+
+    def refresh():
+        # The caller already used the stale copy; the refreshed entry is not what it read.
+        _cache_reads.set(None)
+        try:
+            _fetch_with_cache(
+                url,
+                namespace=namespace,
+                cache_key=cache_key,
+                stale_while_revalidate=False,
+                stale_grace=None,
+                **options,
+            )
+        except Exception as exc:
+            print(f"Background refresh failed for {cache_key}: {exc}")
+        finally:
+            with _refresh_lock:
+                _refreshing.discard(key)
+
+    _refresh_pool.submit(contextvars.copy_context().run, refresh)
+
+
+def wait_for_refreshes():
+    """Block until scheduled stale-while-revalidate refreshes have finished."""
+    while True:
+        with _refresh_lock:
+            if not _refreshing:
+                return
+        time.sleep(0.05)
+
+
+def _fetch_uncoalesced(url, *, params, namespace, cache_key, retries, timeout, min_wait, decode, encode, load, stats):
+    stats["leader"] = True
+    meta = read_meta(namespace, cache_key)
+    session = get_session()
+    host = urlsplit(url).hostname or ""
+    # Replayed responses never reach the upstream, so its limits do not apply.
+    replaying = isinstance(session.get_adapter(url), ReplayAdapter)
+    headers = _conditional_headers(meta)
     last_error = None
 
     for attempt in range(retries):
-        try:
-            response = session.get(url, params=params, timeout=timeout)
+        if _circuit_open(host):
+            last_error = last_error or RuntimeError(f"Circuit open for {host}")
+            break
+        budget = remaining_budget()
+        if budget is not None and budget <= 0:
+            last_error = last_error or RuntimeError("Fetch deadline exceeded")
+            break
 
-            if response.status_code == 429:
-                retry_after = response.headers.get("Retry-After")
-                if retry_after and retry_after.isdigit():
-                    wait = max(float(retry_after), min_wait)
-                else:
-                    wait = max(min_wait, (2 ** attempt) + random.uniform(0.2, 1.0))
-                time.sleep(wait)
-                continue
+        wait = max(min_wait, (2 ** attempt) + random.uniform(0.2, 1.0))
+        try:
+            token_started = time.perf_counter()
+            acquired = replaying or _acquire_token(host)
+            stats["rate_wait_s"] += time.perf_counter() - token_started
+            if not acquired:
+                last_error = last_error or RuntimeError(f"Fetch deadline exceeded waiting for {host} rate limit")
+                break
+            request_timeout = timeout if budget is None else max(0.1, min(timeout, remaining_budget()))
+            stats["attempts"] += 1
+            with _host_semaphore(host):
+                response = session.get(url, params=params, headers=headers, timeout=request_timeout)
+            status = stats["status"] = response.status_code
+            stats["ttfb_ms"] = round(response.elapsed.total_seconds() * 1000.0, 1)
+            stats["bytes"] += len(response.content or b"")
 
-            if 500 <= response.status_code < 600:
-                wait = max(min_wait, (2 ** attempt) + random.uniform(0.2, 1.0))
-                time.sleep(wait)
+            if status == 304 and headers:
+                _record_success(host)
+                payload = _load_cached(namespace, cache_key, load)
+                if payload is not None:
+                    update_meta(namespace, cache_key, fetched_at=time.time())
+                    return payload, "revalidated"
+                headers = {}
                 continue
 
-            response.raise_for_status()
-            payload = response.json()
-            cache_file.write_text(json.dumps(payload), encoding="utf-8")
-            return payload, "live"
+            if status == 429:
+                retry_after = response.headers.get("Retry-After")
+                if retry_after and retry_after.isdigit():
+                    wait = max(min(float(retry_after), MAX_RETRY_AFTER), min_wait)
+                last_error = RuntimeError(f"HTTP 429 from {host}")
+            elif status >= 500:
+                _record_failure(host)
+                last_error = RuntimeError(f"HTTP {status} from {host}")
+            elif status >= 400 and status not in RETRYABLE_STATUSES:
+                _record_success(host)
+                last_error = RuntimeError(f"HTTP {status} from {host} (not retried)")
+                break
+            else:
+                response.raise_for_status()
+                payload = decode(response)
+                _record_success(host)
+                write_entry(
+                    namespace,
+                    cache_key,
+                    encode(payload),
+                    {
+                        "url": url,
+                        "fetched_at": time.time(),
+                        "etag": response.headers.get("ETag"),
+                        "last_modified": response.headers.get("Last-Modified"),
+                    },
+                )
+                return payload, "live"
+        except (requests.ConnectionError, requests.Timeout) as exc:
+            _record_failure(host)
+            last_error = exc
         except Exception as exc:
             last_error = exc
-            if attempt < retries - 1:
-                wait = max(min_wait, (2 ** attempt) + random.uniform(0.2, 1.0))
-                time.sleep(wait)
 
-    if cache_file.exists():
-        return json.loads(cache_file.read_text(encoding="utf-8")), "cache"
+        if attempt == retries - 1 or _circuit_open(host):
+            continue
+        budget = remaining_budget()
+        if budget is not None and wait >= budget:
+            break
+        time.sleep(wait)
+        stats["sleep_s"] += wait
+
+    _release_probe(host)
+    if has_entry(namespace, cache_key):
+        payload = _load_cached(namespace, cache_key, load)
+        if payload is not None:
+            return payload, "cache"
 
     raise RuntimeError(f"Fetch failed and no cache available for {cache_key}: {last_error}")
 
 
+def fetch_json_with_cache(
+    url: str,
+    *,
+    params=None,
+    namespace: str,
+    cache_key: str = None,
+    retries: int = 5,
+    timeout: int = 20,
+    min_wait: float = 1.5,
+    ttl=None,
+    stale_while_revalidate=None,
+    stale_grace=None,
+):
+    """Fetch JSON with backoff and cache fallback.
+
+    The cache entry is identified by namespace plus cache_key, which
+    defaults to canonical_request_key(url, params). Concurrent identical
+    requests in this process share one in-flight fetch.
+
+    A cached payload younger than ttl seconds (default CACHE_TTLS[namespace],
+    0 disables) is returned without a network call. Older entries are
+    revalidated with If-None-Match/If-Modified-Since when the server sent
+    validators, and a 304 serves the cached body. With stale_while_revalidate,
+    entries less than stale_grace seconds past their TTL are returned at
+    once and refreshed in the background.
+    Returns (payload, source) where source is "live", "cache-fresh",
+    "revalidated", "stale" or "cache".
+    Raises RuntimeError when both live and cache fail.
+    """
+    return _fetch_with_cache(
+        url,
+        params=params,
+        namespace=namespace,
+        cache_key=cache_key,
+        retries=retries,
+        timeout=timeout,
+        min_wait=min_wait,
+        ttl=ttl,
+        stale_while_revalidate=stale_while_revalidate,
+        stale_grace=stale_grace,
+        decode=lambda response: response.json(),
+        encode=json.dumps,
+        load=json.loads,
+    )
+
+
 def fetch_text_with_cache(
     url: str,
     *,
     namespace: str,
-    cache_key: str,
+    cache_key: str = None,
     retries: int = 5,
     timeout: int = 20,
     min_wait: float = 1.5,
+    ttl=None,
+    stale_while_revalidate=None,
+    stale_grace=None,
 ):
     """Fetch text with backoff and cache fallback.
 
-    Returns (payload, source) where source is "live" or "cache".
+    Keys, coalescing, ttl, conditional requests and stale_while_revalidate
+    work as in fetch_json_with_cache.
+    Returns (payload, source) where source is "live", "cache-fresh",
+    "revalidated", "stale" or "cache".
     """
-    cache_file = _cache_path(namespace, cache_key)
-    session = requests.Session()
-    last_error = None
+    return _fetch_with_cache(
+        url,
+        params=None,
+        namespace=namespace,
+        cache_key=cache_key,
+        retries=retries,
+        timeout=timeout,
+        min_wait=min_wait,
+        ttl=ttl,
+        stale_while_revalidate=stale_while_revalidate,
+        stale_grace=stale_grace,
+        decode=lambda response: response.text,
+        encode=lambda payload: payload,
+        load=lambda text: text,
+    )
 
-    for attempt in range(retries):
-        try:
-            response = session.get(url, timeout=timeout)
 
-            if response.status_code == 429:
-                retry_after = response.headers.get("Retry-After")
-                if retry_after and retry_after.isdigit():
-                    wait = max(float(retry_after), min_wait)
-                else:
-                    wait = max(min_wait, (2 ** attempt) + random.uniform(0.2, 1.0))
-                time.sleep(wait)
-                continue
+async def fetch_batch_async(batch):
+    """Run a batch of fetches concurrently, capped per upstream host.
 
-            if 500 <= response.status_code < 600:
-                wait = max(min_wait, (2 ** attempt) + random.uniform(0.2, 1.0))
-                time.sleep(wait)
-                continue
+    Each item is a dict of fetch_*_with_cache keyword arguments plus "url"
+    and an optional "kind" ("json" or "text", default "json"). Returns a
+    list in input order holding (payload, source) or the raised exception.
+    """
+    import asyncio
 
-            response.raise_for_status()
-            payload = response.text
-            cache_file.write_text(payload, encoding="utf-8")
-            return payload, "live"
-        except Exception as exc:
-            last_error = exc
-            if attempt < retries - 1:
-                wait = max(min_wait, (2 ** attempt) + random.uniform(0.2, 1.0))
-                time.sleep(wait)
+    semaphores = {}
 
-    if cache_file.exists():
-        return cache_file.read_text(encoding="utf-8"), "cache"
+    async def run(spec):
+        spec = dict(spec)
+        kind = spec.pop("kind", "json")
+        url = spec.pop("url")
+        fetch = fetch_text_with_cache if kind == "text" else fetch_json_with_cache
+        host = urlsplit(url).hostname or ""
+        if host not in semaphores:
+            semaphores[host] = asyncio.Semaphore(HOST_CONCURRENCY.get(host, DEFAULT_HOST_CONCURRENCY))
+        async with semaphores[host]:
+            return await asyncio.to_thread(fetch, url, **spec)
 
-    raise RuntimeError(f"Fetch failed and no cache available for {cache_key}: {last_error}")
+    return await asyncio.gather(*(run(spec) for spec in batch), return_exceptions=True)
+
+
+def fetch_batch(batch):
+    """Blocking wrapper around fetch_batch_async for synchronous scripts."""
+    import asyncio
+
+    return asyncio.run(fetch_batch_async(batch))
@@ -0,0 +1,136 @@
+"""Import-time benchmark for the pipeline entry points.
+
+Imports each entry point in a fresh interpreter with -X importtime and
+reports the median cumulative import time of the module itself, the
+process wall time, and the slowest imports it pulls in. Importing must not
+do any work, so the numbers measure startup only.
+
+    python bench_startup.py
+    python bench_startup.py --repeat 7 --json data/metrics/startup.json
+    python bench_startup.py --max-ms 300    # exit 1 if any entry point is slower
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ENTRY_POINTS = [
+    "pipeline",
+    "analysis_longterm",
+    "analysis_shortterm",
+    "fetch_news",
+    "fetch_watchlist_quotes",
+    "build_asset_snapshots",
+    "fetch_data",
+    "analysis",
+    "cache_manager",
+    "history_store",
+    "scoring_rubric",
+]
+
+
+def parse_importtime(stderr, module):
+    """Cumulative import time (us) of `module` and of each import beneath it.
+
+    -X importtime prints children before their parent, indented one level
+    deeper, so the module's dependencies are the deeper rows right above it.
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        fields = line[len("import time:"):].split("|")
+        try:
+            cumulative_us = int(fields[1])
+        except ValueError:
+            continue  # header row
+        name = fields[2].rstrip()
+        rows.append((len(name) - len(name.lstrip()), name.strip(), cumulative_us))
+
+    for index, (level, name, cumulative_us) in enumerate(rows):
+        if name != module or level != 1:
+            continue
+        children = {}
+        for child_level, child, child_us in reversed(rows[:index]):
+            if child_level <= level:
+                break
+            children[child] = child_us
+        return cumulative_us, children
+    return 0, {}
+
+
+def measure(module, cwd):
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+    )
+    wall_ms = (time.perf_counter() - started) * 1000.0
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed: {proc.stderr.strip().splitlines()[-1]}")
+    return (wall_ms, *parse_importtime(proc.stderr, module))
+
+
+def bench(module, repeat=5, top=5, cwd=None):
+    cwd = cwd or Path(__file__).resolve().parent
+    walls, imports, heaviest = [], [], {}
+    for _ in range(repeat):
+        wall_ms, module_us, children = measure(module, cwd)
+        walls.append(wall_ms)
+        imports.append(module_us / 1000.0)
+        for name, cumulative_us in children.items():
+            heaviest.setdefault(name, []).append(cumulative_us / 1000.0)
+    slowest = sorted(((statistics.median(v), k) for k, v in heaviest.items()), reverse=True)[:top]
+    return {
+        "module": module,
+        "import_ms": round(statistics.median(imports), 1),
+        "wall_ms": round(statistics.median(walls), 1),
+        "slowest_imports": [{"module": name, "cumulative_ms": round(ms, 1)} for ms, name in slowest],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure entry point import time.")
+    parser.add_argument("modules", nargs="*", default=ENTRY_POINTS)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=3, help="slowest dependencies to list")
+    parser.add_argument("--json", dest="json_path", help="also write results to this file")
+    parser.add_argument("--max-ms", type=float, help="fail when an import takes longer than this")
+    args = parser.parse_args(argv)
+
+    results = []
+    print(f"{'entry point':<24} {'import ms':>10} {'wall ms':>9}  slowest imports")
+    for module in args.modules:
+        try:
+            row = bench(module, args.repeat, args.top)
+        except RuntimeError as exc:
+            print(f"{module:<24} {'error':>10} {'':>9}  {exc}")
+            results.append({"module": module, "error": str(exc)})
+            continue
+        slowest = ", ".join(f"{s['module']} {s['cumulative_ms']:.0f}" for s in row["slowest_imports"])
+        print(f"{module:<24} {row['import_ms']:>10.1f} {row['wall_ms']:>9.1f}  {slowest}")
+        results.append(row)
+
+    if args.json_path:
+        path = Path(args.json_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {"python": sys.version.split()[0], "repeat": args.repeat, "results": results}
+        path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+        print("Saved", path)
+
+    if args.max_ms is not None:
+        slow = [r["module"] for r in results if "error" in r or r["import_ms"] > args.max_ms]
+        if slow:
+            print(f"Over {args.max_ms:.0f} ms: {', '.join(slow)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,133 +1,26 @@
 ﻿import json
-import re
 from datetime import UTC, datetime
 from pathlib import Path
 
+from build_manifest import write_if_changed
+from universe import assets
+
 DATA_DIR = Path("data")
 ASSETS_DIR = DATA_DIR / "assets"
 ASSETS_DIR.mkdir(parents=True, exist_ok=True)
 
-SHORT_REPORT = Path("reports/short_term.md")
-LONG_REPORT = Path("reports/long_term_report.md")
+SHORT_RESULTS = DATA_DIR / "results" / "short_term.json"
+LONG_RESULTS_DIR = DATA_DIR / "results" / "long_term"
 NEWS_FILE = DATA_DIR / "news_latest.json"
 ANALYSIS_FILE = DATA_DIR / "analysis_latest.json"
 WATCHLIST_FILE = DATA_DIR / "watchlist_quotes.json"
 
-CRYPTO_ASSETS = {
-    "bitcoin": {
-        "name": "Bitcoin",
-        "symbol": "BTC",
-        "heading": "Bitcoin (BTC)",
-        "news_keyword": "bitcoin",
-        "details_page": "btc.html",
-        "about": {
-            "what_it_is": "Bitcoin is a decentralized digital currency with no central issuer.",
-            "what_it_represents": "It is often treated as a scarce monetary asset and macro risk barometer.",
-            "who_or_what": "It is not a company. It is an open-source network maintained by global participants.",
-            "how_it_works": "Transactions are validated by proof-of-work mining and stored on a public blockchain."
-        },
-    },
-    "ethereum": {
-        "name": "Ethereum",
-        "symbol": "ETH",
-        "heading": "Ethereum (ETH)",
-        "news_keyword": "ethereum",
-        "details_page": "eth.html",
-        "about": {
-            "what_it_is": "Ethereum is a programmable blockchain platform and the native asset is ETH.",
-            "what_it_represents": "It represents usage of smart contracts, DeFi rails, and on-chain applications.",
-            "who_or_what": "It is not a company. It is an open protocol supported by developers, validators, and users.",
-            "how_it_works": "It runs smart contracts on-chain and secures consensus through proof-of-stake validators."
-        },
-    },
-}
-
-WATCHLIST_ASSETS = {
-    "spy": {
-        "name": "S&P 500 ETF",
-        "symbol": "SPY",
-        "news_keyword": "s&p 500",
-        "details_page": "asset.html?asset=spy",
-        "about": {
-            "what_it_is": "SPY is an exchange-traded fund designed to track the S&P 500 Index.",
-            "what_it_represents": "It represents broad large-cap U.S. equity market exposure.",
-            "who_or_what": "Issued by State Street, it holds a basket of U.S. large-cap stocks.",
-            "how_it_works": "Its price follows the index through a portfolio that mirrors S&P 500 constituents."
-        },
-    },
-    "qqq": {
-        "name": "Nasdaq 100 ETF",
-        "symbol": "QQQ",
-        "news_keyword": "nasdaq",
-        "details_page": "asset.html?asset=qqq",
-        "about": {
-            "what_it_is": "QQQ is an ETF that tracks the Nasdaq-100 Index.",
-            "what_it_represents": "It represents large non-financial growth companies, especially technology-heavy exposure.",
-            "who_or_what": "Issued by Invesco, it holds Nasdaq-100 component stocks.",
-            "how_it_works": "Its holdings are rebalanced to follow index methodology and sector concentration rules."
-        },
-    },
-    "nvda": {
-        "name": "NVIDIA",
-        "symbol": "NVDA",
-        "news_keyword": "nvidia",
-        "details_page": "asset.html?asset=nvda",
-        "about": {
-            "what_it_is": "NVIDIA is a semiconductor and computing company focused on GPUs and AI platforms.",
-            "what_it_represents": "It represents demand for AI infrastructure, data center compute, and advanced chips.",
-            "who_or_what": "Publicly traded U.S. company: NVIDIA Corporation.",
-            "how_it_works": "Revenue is driven by GPU hardware and software ecosystems used in AI, gaming, and enterprise compute."
-        },
-    },
-    "gold": {
-        "name": "Gold Futures",
-        "symbol": "GC=F",
-        "news_keyword": "gold",
-        "details_page": "asset.html?asset=gold",
-        "about": {
-            "what_it_is": "GC=F tracks front-month COMEX gold futures pricing.",
-            "what_it_represents": "It represents market expectations for gold as a store-of-value and macro hedge.",
-            "who_or_what": "It is a commodity futures contract, not a company.",
-            "how_it_works": "Futures prices reflect supply-demand, rates, dollar strength, and geopolitical risk sentiment."
-        },
-    },
-    "oil": {
-        "name": "Crude Oil Futures",
-        "symbol": "CL=F",
-        "news_keyword": "oil",
-        "details_page": "asset.html?asset=oil",
-        "about": {
-            "what_it_is": "CL=F tracks front-month WTI crude oil futures pricing.",
-            "what_it_represents": "It represents global energy demand, supply constraints, and geopolitical risk premiums.",
-            "who_or_what": "It is a commodity futures contract, not a company.",
-            "how_it_works": "Futures react to inventory data, production policy, transport bottlenecks, and macro growth expectations."
-        },
-    },
-}
-
-
-def read_text(path: Path) -> str:
-    if not path.exists():
-        return ""
-    return path.read_text(encoding="utf-8")
-
-
 def read_json(path: Path, default):
     if not path.exists():
         return default
     return json.loads(path.read_text(encoding="utf-8"))
 
 
-def extract_section(markdown: str, heading: str) -> str:
-    marker = f"## {heading}"
-    start = markdown.find(marker)
-    if start == -1:
-        return ""
-    rest = markdown[start:]
-    next_section = rest.find("\n## ", len(marker))
-    return rest if next_section == -1 else rest[:next_section]
-
-
 def clean_section(markdown: str) -> str:
     cleaned = (markdown or "").strip()
     while cleaned.endswith("---"):
@@ -135,83 +28,40 @@ def clean_section(markdown: str) -> str:
     return cleaned
 
 
-def parse_money(text: str):
-    if not text:
-        return None
-    cleaned = text.replace("$", "").replace(",", "").strip()
-    try:
-        return float(cleaned)
-    except ValueError:
-        return None
-
-
-def parse_percent(text: str):
-    if not text:
-        return None
-    cleaned = text.replace("%", "").replace("+", "").strip()
-    try:
-        return float(cleaned)
-    except ValueError:
-        return None
-
-
-def line_value(section: str, label: str):
-    pattern = re.compile(rf"- \*\*{re.escape(label)}:\*\*\s*([^\n]+)", re.IGNORECASE)
-    match = pattern.search(section)
-    return match.group(1).strip() if match else ""
-
-
-def infer_verdict(long_section: str):
-    match = re.search(r"\*\*Long-term verdict:\*\*\s*([^\n]+)", long_section)
-    if match:
-        return match.group(1).strip()
-    match = re.search(r"Long-term stance:\s*([^\.\n]+)", long_section)
-    if match:
-        return match.group(1).strip()
-    match = re.search(r"Valuation verdict:\s*\n([^\n]+)", long_section)
-    if match:
-        return match.group(1).strip()
-    match = re.search(r"Relative valuation verdict:\s*\n([^\n]+)", long_section)
-    if match:
-        return match.group(1).strip()
-    return ""
-
-
-def infer_summary_line(long_section: str):
-    match = re.search(r"Long-term:\s*([^\n]+)", long_section)
-    return match.group(1).strip() if match else ""
-
-
-def infer_valuation_band(long_section: str):
-    match = re.search(r"- \*\*Valuation band:\*\*\s*([^\n]+)", long_section)
-    if not match:
-        return ""
-    return match.group(1).strip().lower()
-def infer_composite_score(long_section: str):
-    match = re.search(r"- \*\*Composite score:\*\*\s*([0-9]+(?:\.[0-9]+)?)\/100", long_section)
-    if not match:
-        return None
-    try:
-        return float(match.group(1))
-    except ValueError:
-        return None
-
-
-def load_news():
-    payload = read_json(NEWS_FILE, {"generated_at": "", "items": []})
+def round_or_none(value, digits):
+    return round(value, digits) if isinstance(value, (int, float)) else None
+
+
+def load_news(payload=None):
+    if payload is None:
+        payload = read_json(NEWS_FILE, {"generated_at": "", "items": []})
     return {
         "generated_at": payload.get("generated_at", ""),
         "items": payload.get("items", []),
     }
 
 
+def load_results(path, payload=None):
+    if payload is None:
+        payload = read_json(path, {"assets": {}})
+    return payload
+
+
+def load_long_result(asset_id, long_index):
+    """Load one asset's long-term shard, if the index lists it."""
+    if asset_id not in long_index.get("assets", {}):
+        return {}
+    return read_json(LONG_RESULTS_DIR / f"{asset_id}.json", {})
+
+
 def load_analysis_map():
     rows = read_json(ANALYSIS_FILE, [])
     return {row.get("asset"): row for row in rows if row.get("asset")}
 
 
-def load_watchlist_quotes():
-    payload = read_json(WATCHLIST_FILE, {"generated_at": "", "source": "unknown", "quotes": {}})
+def load_watchlist_quotes(payload=None):
+    if payload is None:
+        payload = read_json(WATCHLIST_FILE, {"generated_at": "", "source": "unknown", "quotes": {}})
     return {
         "generated_at": payload.get("generated_at", ""),
         "source": payload.get("source", "unknown"),
@@ -238,54 +88,49 @@ def filter_news(items, keyword):
     return out[:12]
 
 
-def build_crypto_payload(asset_id, meta, short_md, long_md, analysis_map, news):
-    heading = meta["heading"]
-    short_section = clean_section(extract_section(short_md, heading))
-    long_section = clean_section(extract_section(long_md, heading))
+def valuation_fields(long_result):
+    return {
+        "verdict": long_result.get("verdict", ""),
+        "band": long_result.get("band", ""),
+        "summary_line": long_result.get("summary_line", ""),
+        "score": round_or_none(long_result.get("composite"), 1),
+        "long_term_markdown": clean_section(long_result.get("markdown")),
+    }
+
 
-    current_price = parse_money(line_value(short_section, "Current price"))
-    change_7d = parse_percent(line_value(short_section, "7D change"))
-    change_30d = parse_percent(line_value(short_section, "30D change"))
-    trend = line_value(short_section, "Trend").replace("**", "")
-    momentum = line_value(short_section, "Momentum").replace("**", "")
-    volatility = line_value(short_section, "Volatility").replace("**", "")
-    data_source = line_value(short_section, "Data source")
+def build_crypto_payload(asset_id, meta, short_result, long_result, analysis_map, news):
+    short_section = clean_section(short_result.get("markdown"))
+    long_section = clean_section(long_result.get("markdown"))
 
     analysis_row = analysis_map.get(asset_id, {})
     change_24h = analysis_row.get("pct24")
 
     return {
         "asset": asset_id,
-        "name": meta["name"],
-        "symbol": meta["symbol"],
+        "name": meta.name,
+        "symbol": meta.symbol,
         "market_type": "crypto",
-        "details_page": meta.get("details_page"),
+        "details_page": meta.details_page,
         "updated_at": datetime.now(UTC).isoformat(),
-        "about": meta.get("about", {}),
+        "about": meta.about or {},
         "source": {
-            "short_term": data_source or "unknown",
+            "short_term": short_result.get("source") or "unknown",
             "news_generated_at": news.get("generated_at", ""),
         },
         "price": {
-            "current_usd": current_price,
+            "current_usd": short_result.get("current"),
             "change_24h_pct": change_24h,
-            "change_7d_pct": change_7d,
-            "change_30d_pct": change_30d,
+            "change_7d_pct": round_or_none(short_result.get("change_7d"), 2),
+            "change_30d_pct": round_or_none(short_result.get("change_30d"), 2),
         },
         "indicators": {
-            "trend": trend,
-            "momentum": momentum,
-            "volatility": volatility,
-        },
-        "valuation": {
-            "verdict": infer_verdict(long_section),
-            "band": infer_valuation_band(long_section),
-            "summary_line": infer_summary_line(long_section),
-            "score": infer_composite_score(long_section),
-            "long_term_markdown": long_section,
+            "trend": short_result.get("trend", ""),
+            "momentum": short_result.get("momentum", ""),
+            "volatility": short_result.get("volatility", ""),
         },
+        "valuation": valuation_fields(long_result),
         "analysis_markdown": f"{long_section}\n\n---\n\n### Short-Term Context\n\n{short_section}",
-        "news": filter_news(news.get("items", []), meta.get("news_keyword", asset_id)),
+        "news": filter_news(news.get("items", []), meta.news_keyword or asset_id),
     }
 
 
@@ -299,17 +144,16 @@ def classify_move(pct):
     return "SIDEWAYS"
 
 
-def build_watchlist_payload(asset_id, meta, quotes, news, long_md):
+def build_watchlist_payload(asset_id, meta, quotes, news, long_result):
     q = quotes.get(asset_id, {})
     change_24h = q.get("change_24h_pct")
     trend = classify_move(change_24h)
 
-    heading = f"{meta['name']} ({meta['symbol']})"
-    long_section = clean_section(extract_section(long_md, heading))
-    verdict = infer_verdict(long_section)
+    long_section = clean_section(long_result.get("markdown"))
+    valuation = valuation_fields(long_result)
 
     summary_lines = [
-        f"## {meta['name']} ({meta['symbol']})",
+        f"## {meta.heading}",
         "",
         "### Short-Term Context",
         "",
@@ -326,12 +170,12 @@ def build_watchlist_payload(asset_id, meta, quotes, news, long_md):
 
     return {
         "asset": asset_id,
-        "name": meta["name"],
-        "symbol": meta["symbol"],
+        "name": meta.name,
+        "symbol": meta.symbol,
         "market_type": "traditional",
-        "details_page": meta.get("details_page"),
+        "details_page": meta.details_page,
         "updated_at": datetime.now(UTC).isoformat(),
-        "about": meta.get("about", {}),
+        "about": meta.about or {},
         "source": {
             "short_term": q.get("fetch_source") or "unknown",
             "news_generated_at": news.get("generated_at", ""),
@@ -347,15 +191,9 @@ def build_watchlist_payload(asset_id, meta, quotes, news, long_md):
             "momentum": "N/A",
             "volatility": "N/A",
         },
-        "valuation": {
-            "verdict": verdict or "Snapshot only",
-            "band": infer_valuation_band(long_section),
-            "summary_line": infer_summary_line(long_section),
-            "score": infer_composite_score(long_section),
-            "long_term_markdown": long_section,
-        },
+        "valuation": {**valuation, "verdict": valuation["verdict"] or "Snapshot only"},
         "analysis_markdown": analysis_markdown,
-        "news": filter_news(news.get("items", []), meta.get("news_keyword", meta["name"])),
+        "news": filter_news(news.get("items", []), meta.news_keyword or meta.name),
     }
 
 def index_entry(payload):
@@ -378,27 +216,28 @@ def index_entry(payload):
     }
 
 
-def build_assets():
-    short_md = read_text(SHORT_REPORT)
-    long_md = read_text(LONG_REPORT)
-    news = load_news()
+def build_assets(short_results=None, long_index=None, news=None, watchlist=None):
+    """Build data/assets/*.json. Inputs not passed in memory are read from disk."""
+    short_results = load_results(SHORT_RESULTS, short_results)
+    long_index = load_results(LONG_RESULTS_DIR / "index.json", long_index)
+    short_assets = short_results.get("assets", {})
+    news = load_news(news)
     analysis_map = load_analysis_map()
-    watchlist = load_watchlist_quotes()
+    watchlist = load_watchlist_quotes(watchlist)
     watchlist_quotes = watchlist.get("quotes", {})
 
-    first_asset_pos = long_md.find("\n## ")
-    macro_markdown = long_md[:first_asset_pos].strip() if first_asset_pos > 0 else ""
+    macro_markdown = long_index.get("macro_markdown", "")
 
     assets_for_index = []
 
-    for asset_id, meta in CRYPTO_ASSETS.items():
-        payload = build_crypto_payload(asset_id, meta, short_md, long_md, analysis_map, news)
-        (ASSETS_DIR / f"{asset_id}.json").write_text(json.dumps(payload, indent=2), encoding="utf-8")
-        assets_for_index.append(index_entry(payload))
-
-    for asset_id, meta in WATCHLIST_ASSETS.items():
-        payload = build_watchlist_payload(asset_id, meta, watchlist_quotes, news, long_md)
-        (ASSETS_DIR / f"{asset_id}.json").write_text(json.dumps(payload, indent=2), encoding="utf-8")
+    for meta in assets("asset_snapshots"):
+        asset_id = meta.id
+        long_result = load_long_result(asset_id, long_index)
+        if meta.market_type == "crypto":
+            payload = build_crypto_payload(asset_id, meta, short_assets.get(asset_id, {}), long_result, analysis_map, news)
+        else:
+            payload = build_watchlist_payload(asset_id, meta, watchlist_quotes, news, long_result)
+        write_if_changed(ASSETS_DIR / f"{asset_id}.json", json.dumps(payload, indent=2))
         assets_for_index.append(index_entry(payload))
 
     overview_news = filter_news(news.get("items", []), "")[:10]
@@ -410,8 +249,9 @@ def build_assets():
         "overview_news": overview_news,
     }
 
-    (ASSETS_DIR / "index.json").write_text(json.dumps(index_payload, indent=2), encoding="utf-8")
-    print("Saved", ASSETS_DIR / "index.json")
+    if write_if_changed(ASSETS_DIR / "index.json", json.dumps(index_payload, indent=2)):
+        print("Saved", ASSETS_DIR / "index.json")
+    return index_payload
 
 
 if __name__ == "__main__":
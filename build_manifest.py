@@ -0,0 +1,97 @@
+"""Content-hash manifest for incremental pipeline runs.
+
+For every stage the manifest stores a hash of its code and upstream outputs,
+the cache entries it read (with the fetch time of each), and hashes of the
+files it wrote. A stage can be skipped when all of these still match: same
+code, same upstream files, every cache entry still fresh and unchanged, and
+its outputs untouched on disk.
+
+write_if_changed() keeps stages from rewriting files whose content only
+differs in run timestamps, so unchanged inputs leave the tree clean.
+"""
+
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+
+MANIFEST_FILE = Path(os.getenv("BUILD_MANIFEST", "data/build_manifest.json"))
+
+# Fields that change on every run without the content changing.
+IGNORED_KEYS = {"generated_at", "updated_at", "news_generated_at"}
+TIMESTAMP_LINE = re.compile(r"^_(Updated|Generated automatically)\b.*_\s*$", re.MULTILINE)
+
+
+def _strip_ignored(value):
+    if isinstance(value, dict):
+        return {k: _strip_ignored(v) for k, v in value.items() if k not in IGNORED_KEYS}
+    if isinstance(value, list):
+        return [_strip_ignored(v) for v in value]
+    if isinstance(value, str):
+        return TIMESTAMP_LINE.sub("", value)
+    return value
+
+
+def normalized(path, text):
+    """Text with run timestamps removed, for change comparisons."""
+    if Path(path).suffix == ".json":
+        try:
+            return json.dumps(_strip_ignored(json.loads(text)), sort_keys=True)
+        except ValueError:
+            return text
+    return TIMESTAMP_LINE.sub("", text)
+
+
+def write_if_changed(path, text):
+    """Write text unless the file already holds the same content (timestamps aside).
+
+    Returns True when the file was written.
+    """
+    path = Path(path)
+    if path.exists():
+        try:
+            current = path.read_text(encoding="utf-8")
+        except (OSError, UnicodeDecodeError):
+            current = None
+        if current is not None and normalized(path, current) == normalized(path, text):
+            return False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+    return True
+
+
+def file_hash(path):
+    """sha256 of a file, or of every file under a directory (None if missing)."""
+    path = Path(path)
+    if path.is_dir():
+        digest = hashlib.sha256()
+        for child in sorted(p for p in path.rglob("*") if p.is_file()):
+            digest.update(child.relative_to(path).as_posix().encode("utf-8"))
+            digest.update(child.read_bytes())
+        return digest.hexdigest()
+    if not path.exists():
+        return None
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def combined_hash(parts):
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def load_manifest(path=MANIFEST_FILE):
+    path = Path(path)
+    if not path.exists():
+        return {}
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except ValueError:
+        return {}
+
+
+def save_manifest(manifest, path=MANIFEST_FILE):
+    write_if_changed(path, json.dumps(manifest, indent=2, sort_keys=True))
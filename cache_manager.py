@@ -0,0 +1,532 @@
+"""Storage, eviction and maintenance for the api_utils response cache.
+
+Two backends share one interface, selected with API_CACHE_BACKEND:
+  file    one body file plus a .meta.json sidecar per entry (default)
+  sqlite  a single WAL-mode database that several processes can share
+Bodies are compressed with API_CACHE_COMPRESSION in both backends.
+
+Usage:
+    python cache_manager.py stats
+    python cache_manager.py compact [--max-bytes N] [--policy lru|lfu]
+"""
+
+import argparse
+import atexit
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from compressed_io import SUFFIXES, compress_bytes, decompress_bytes, resolve_codec
+
+CACHE_DIR = Path("data/cache")
+CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
+CACHE_BACKEND = os.getenv("API_CACHE_BACKEND", "file")
+SQLITE_PATH = Path(os.getenv("API_CACHE_SQLITE_PATH", str(CACHE_DIR / "responses.sqlite3")))
+# Codec for cached bodies ("gzip", "zstd" or "none"); existing entries stay readable.
+CACHE_COMPRESSION = os.getenv("API_CACHE_COMPRESSION", "gzip")
+CACHE_COMPRESSION_LEVEL = int(os.getenv("API_CACHE_COMPRESSION_LEVEL", "6"))
+
+# Total bytes the cache may hold before entries are evicted.
+MAX_CACHE_BYTES = int(os.getenv("API_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+# "lru" evicts the least recently read entries first, "lfu" the least read.
+EVICTION_POLICY = os.getenv("API_CACHE_EVICTION", "lru")
+# An over-budget cache (or namespace) is drained to this fraction of its limit,
+# so the writes that follow do not each trigger another eviction pass.
+EVICTION_LOW_WATER = float(os.getenv("API_CACHE_LOW_WATER", "0.9"))
+# compact() leaves younger .tmp files alone: they may be writes in progress.
+TMP_MAX_AGE = 3600
+
+# Per-namespace byte quotas, enforced on top of the global budget.
+NAMESPACE_QUOTAS = {
+    "coingecko_market_chart": 64 * 1024 * 1024,
+    "yahoo_history": 32 * 1024 * 1024,
+    "stooq_history": 32 * 1024 * 1024,
+    "news_feed": 8 * 1024 * 1024,
+}
+
+
+def _eviction_order(entries, max_bytes, quotas, low_water=EVICTION_LOW_WATER):
+    """Pick entries to drop from a list already sorted by eviction rank.
+
+    Nothing goes until a namespace or the whole cache is over its limit; then
+    entries go until it is down to low_water times that limit.
+    """
+    usage = {}
+    for entry in entries:
+        usage[entry["namespace"]] = usage.get(entry["namespace"], 0) + entry["size"]
+    targets = {
+        namespace: quotas[namespace] * low_water
+        for namespace, used in usage.items()
+        if used > quotas.get(namespace, float("inf"))
+    }
+
+    removed = []
+    kept = []
+    for entry in entries:
+        namespace = entry["namespace"]
+        if usage[namespace] > targets.get(namespace, float("inf")):
+            usage[namespace] -= entry["size"]
+            removed.append(entry)
+        else:
+            kept.append(entry)
+
+    total = sum(usage.values())
+    if total > max_bytes:
+        for entry in kept:
+            if total <= max_bytes * low_water:
+                break
+            total -= entry["size"]
+            removed.append(entry)
+    return removed
+
+
+def _rank(policy):
+    def rank(entry):
+        if policy == "lfu":
+            return entry["hits"], entry["last_access"]
+        return entry["last_access"]
+
+    return rank
+
+
+class FileCache:
+    def __init__(self, root=CACHE_DIR):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._usage = None
+        self._usage_lock = threading.Lock()
+        self._meta_locks = {}
+        self._meta_locks_lock = threading.Lock()
+        # Reads since the last flush_hits(), as {entry path: (hits, last_access)};
+        # sidecars are not rewritten on every cache hit.
+        self._hits = {}
+        self._hits_lock = threading.Lock()
+        atexit.register(self.flush_hits)
+
+    def path(self, namespace, key):
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:20]
+        return self.root / f"{namespace}_{digest}.json"
+
+    def _body_file(self, namespace, key):
+        return self._existing_body(self.path(namespace, key))
+
+    @staticmethod
+    def _existing_body(base):
+        for suffix in (".gz", ".zst", ""):
+            candidate = base.with_name(base.name + suffix)
+            if candidate.exists():
+                return candidate
+        return None
+
+    @staticmethod
+    def _base_path(body_file):
+        return body_file.with_name(body_file.name.split(".", 1)[0] + ".json")
+
+    @staticmethod
+    def _meta_path(body_file):
+        return body_file.with_name(body_file.name.split(".", 1)[0] + ".meta.json")
+
+    @staticmethod
+    def _write_atomic(path, data):
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+
+    def _meta_lock(self, path):
+        with self._meta_locks_lock:
+            return self._meta_locks.setdefault(path, threading.Lock())
+
+    def _read_meta_file(self, body_file):
+        meta_file = self._meta_path(body_file)
+        if not meta_file.exists():
+            return {}
+        try:
+            return json.loads(meta_file.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def has_entry(self, namespace, key):
+        return self._body_file(namespace, key) is not None
+
+    def read_meta(self, namespace, key):
+        return self._read_meta_file(self.path(namespace, key))
+
+    def update_meta(self, namespace, key, **fields):
+        body_file = self.path(namespace, key)
+        meta_file = self._meta_path(body_file)
+        with self._meta_lock(meta_file):
+            meta = self._read_meta_file(body_file)
+            meta.update(fields)
+            self._write_atomic(meta_file, json.dumps(meta))
+
+    def read_entry(self, namespace, key):
+        body_file = self._body_file(namespace, key)
+        if body_file is None:
+            return None
+        try:
+            text = decompress_bytes(body_file.read_bytes()).decode("utf-8")
+        except FileNotFoundError:
+            return None
+        base = self.path(namespace, key)
+        with self._hits_lock:
+            hits, _ = self._hits.get(base, (0, None))
+            self._hits[base] = (hits + 1, time.time())
+        return text
+
+    def flush_hits(self):
+        """Add the hits recorded since the last flush to the entries' sidecars."""
+        with self._hits_lock:
+            pending, self._hits = self._hits, {}
+        for base, (hits, last_access) in pending.items():
+            body_file = self._existing_body(base)
+            if body_file is None:
+                continue
+            meta_file = self._meta_path(body_file)
+            with self._meta_lock(meta_file):
+                meta = self._read_meta_file(body_file)
+                meta["hits"] = meta.get("hits", 0) + hits
+                meta["last_access"] = max(meta.get("last_access") or 0, last_access)
+                self._write_atomic(meta_file, json.dumps(meta))
+
+    def write_entry(self, namespace, key, text, meta):
+        codec = resolve_codec(CACHE_COMPRESSION)
+        base = self.path(namespace, key)
+        body_file = base.with_name(base.name + SUFFIXES[codec])
+        previous = 0
+        old_file = self._body_file(namespace, key)
+        if old_file is not None:
+            previous = old_file.stat().st_size
+            if old_file != body_file:
+                old_file.unlink(missing_ok=True)
+        self._write_atomic(body_file, compress_bytes(text.encode("utf-8"), codec, CACHE_COMPRESSION_LEVEL))
+        meta = {"namespace": namespace, "cache_key": key, "hits": 0, "last_access": time.time(), **meta}
+        meta_file = self._meta_path(body_file)
+        with self._meta_lock(meta_file):
+            with self._hits_lock:
+                self._hits.pop(base, None)
+            self._write_atomic(meta_file, json.dumps(meta))
+
+        size = body_file.stat().st_size
+        with self._usage_lock:
+            if self._usage is None:
+                self._usage = {}
+                for entry in self.list_entries():
+                    self._usage[entry["namespace"]] = self._usage.get(entry["namespace"], 0) + entry["size"]
+            else:
+                self._usage[namespace] = self._usage.get(namespace, 0) + size - previous
+            total = sum(self._usage.values())
+            over_quota = self._usage.get(namespace, 0) > NAMESPACE_QUOTAS.get(namespace, float("inf"))
+        if total > MAX_CACHE_BYTES or over_quota:
+            self.evict()
+
+    def list_entries(self):
+        """Every stored entry, counting the hits not yet flushed to its sidecar."""
+        with self._hits_lock:
+            pending = dict(self._hits)
+        entries = []
+        for path in self.root.glob("*.json*"):
+            if path.name.endswith((".meta.json", ".tmp")):
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            meta = self._read_meta_file(path)
+            hits, last_access = pending.get(self._base_path(path), (0, None))
+            entries.append(
+                {
+                    "path": path,
+                    "namespace": meta.get("namespace") or path.name.split(".", 1)[0].rsplit("_", 1)[0],
+                    "size": stat.st_size,
+                    "hits": meta.get("hits", 0) + hits,
+                    "last_access": last_access or meta.get("last_access") or meta.get("fetched_at") or stat.st_mtime,
+                    "fetched_at": meta.get("fetched_at"),
+                }
+            )
+        return entries
+
+    def evict(self, max_bytes=None, quotas=None, policy=None, low_water=None):
+        max_bytes = MAX_CACHE_BYTES if max_bytes is None else max_bytes
+        quotas = NAMESPACE_QUOTAS if quotas is None else quotas
+        low_water = EVICTION_LOW_WATER if low_water is None else low_water
+        entries = sorted(self.list_entries(), key=_rank(policy or EVICTION_POLICY))
+        removed = _eviction_order(entries, max_bytes, quotas, low_water)
+        for entry in removed:
+            with self._hits_lock:
+                self._hits.pop(self._base_path(entry["path"]), None)
+            for path in (entry["path"], self._meta_path(entry["path"])):
+                path.unlink(missing_ok=True)
+
+        removed_paths = {entry["path"] for entry in removed}
+        usage = {}
+        for entry in entries:
+            if entry["path"] not in removed_paths:
+                usage[entry["namespace"]] = usage.get(entry["namespace"], 0) + entry["size"]
+        with self._usage_lock:
+            self._usage = usage
+        return removed
+
+    def compact(self, tmp_max_age=TMP_MAX_AGE):
+        self.flush_hits()
+        orphans = 0
+        cutoff = time.time() - tmp_max_age
+        for path in self.root.glob("*.tmp"):
+            try:
+                if path.stat().st_mtime >= cutoff:
+                    continue
+            except OSError:
+                continue
+            path.unlink(missing_ok=True)
+            orphans += 1
+        for path in self.root.glob("*.meta.json"):
+            base = path.with_name(path.name[: -len(".meta.json")] + ".json")
+            if not any(base.with_name(base.name + suffix).exists() for suffix in (".gz", ".zst", "")):
+                path.unlink(missing_ok=True)
+                orphans += 1
+        return orphans
+
+
+class SQLiteCache:
+    """Response cache in one SQLite database with compressed blob bodies."""
+
+    META_COLUMNS = ("url", "fetched_at", "etag", "last_modified", "hits", "last_access")
+
+    def __init__(self, path=SQLITE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS entries (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    body BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    url TEXT,
+                    fetched_at REAL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    hits INTEGER NOT NULL DEFAULT 0,
+                    last_access REAL,
+                    PRIMARY KEY (namespace, key)
+                );
+                CREATE INDEX IF NOT EXISTS entries_by_access ON entries (namespace, last_access);
+                CREATE INDEX IF NOT EXISTS entries_by_age ON entries (namespace, fetched_at);
+                """
+            )
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            import sqlite3
+
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def has_entry(self, namespace, key):
+        row = self._connect().execute(
+            "SELECT 1 FROM entries WHERE namespace = ? AND key = ?", (namespace, key)
+        ).fetchone()
+        return row is not None
+
+    def read_meta(self, namespace, key):
+        row = self._connect().execute(
+            f"SELECT {', '.join(self.META_COLUMNS)} FROM entries WHERE namespace = ? AND key = ?",
+            (namespace, key),
+        ).fetchone()
+        return dict(row) if row else {}
+
+    def update_meta(self, namespace, key, **fields):
+        fields = {name: value for name, value in fields.items() if name in self.META_COLUMNS}
+        if not fields:
+            return
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._connect() as conn:
+            conn.execute(
+                f"UPDATE entries SET {assignments} WHERE namespace = ? AND key = ?",
+                (*fields.values(), namespace, key),
+            )
+
+    def read_entry(self, namespace, key):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT body FROM entries WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE entries SET hits = hits + 1, last_access = ? WHERE namespace = ? AND key = ?",
+                (time.time(), namespace, key),
+            )
+        return decompress_bytes(row["body"]).decode("utf-8")
+
+    def write_entry(self, namespace, key, text, meta):
+        body = compress_bytes(text.encode("utf-8"), CACHE_COMPRESSION, CACHE_COMPRESSION_LEVEL)
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO entries
+                    (namespace, key, body, size, url, fetched_at, etag, last_modified, hits, last_access)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0, ?)
+                """,
+                (
+                    namespace,
+                    key,
+                    body,
+                    len(body),
+                    meta.get("url"),
+                    meta.get("fetched_at"),
+                    meta.get("etag"),
+                    meta.get("last_modified"),
+                    time.time(),
+                ),
+            )
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            used = conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM entries WHERE namespace = ?", (namespace,)
+            ).fetchone()[0]
+        if total > MAX_CACHE_BYTES or used > NAMESPACE_QUOTAS.get(namespace, float("inf")):
+            self.evict()
+
+    def list_entries(self):
+        rows = self._connect().execute(
+            "SELECT namespace, key, size, hits, COALESCE(last_access, fetched_at, 0) AS last_access, fetched_at FROM entries"
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def evict(self, max_bytes=None, quotas=None, policy=None, low_water=None):
+        max_bytes = MAX_CACHE_BYTES if max_bytes is None else max_bytes
+        quotas = NAMESPACE_QUOTAS if quotas is None else quotas
+        low_water = EVICTION_LOW_WATER if low_water is None else low_water
+        order = "hits, last_access" if (policy or EVICTION_POLICY) == "lfu" else "last_access"
+        rows = self._connect().execute(
+            "SELECT namespace, key, size, hits, COALESCE(last_access, fetched_at, 0) AS last_access "
+            f"FROM entries ORDER BY {order}"
+        ).fetchall()
+        removed = _eviction_order([dict(row) for row in rows], max_bytes, quotas, low_water)
+        with self._connect() as conn:
+            conn.executemany(
+                "DELETE FROM entries WHERE namespace = ? AND key = ?",
+                [(entry["namespace"], entry["key"]) for entry in removed],
+            )
+        return removed
+
+    def compact(self):
+        conn = self._connect()
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.execute("VACUUM")
+        return 0
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = SQLiteCache() if CACHE_BACKEND == "sqlite" else FileCache()
+    return _backend
+
+
+def has_entry(namespace, key):
+    return get_backend().has_entry(namespace, key)
+
+
+def read_meta(namespace, key):
+    return get_backend().read_meta(namespace, key)
+
+
+def update_meta(namespace, key, **fields):
+    get_backend().update_meta(namespace, key, **fields)
+
+
+def read_entry(namespace, key):
+    """Return the cached body (or None) and record the hit for LRU/LFU bookkeeping.
+
+    The file backend keeps hits in memory until compact() or exit.
+    """
+    return get_backend().read_entry(namespace, key)
+
+
+def write_entry(namespace, key, text, meta):
+    """Store a body with its metadata, evicting older entries when over budget."""
+    get_backend().write_entry(namespace, key, text, meta)
+
+
+def evict(max_bytes=None, quotas=None, policy=None, low_water=None):
+    """Drain every namespace over its quota, and the cache when over its total
+    budget, to low_water (EVICTION_LOW_WATER) times the limit.
+
+    Returns the list of removed entries.
+    """
+    return get_backend().evict(max_bytes=max_bytes, quotas=quotas, policy=policy, low_water=low_water)
+
+
+def compact(max_bytes=None, policy=None):
+    """Remove orphaned files (or checkpoint and vacuum SQLite), then enforce the budget."""
+    orphans = get_backend().compact()
+    removed = evict(max_bytes=max_bytes, policy=policy)
+    return {"orphans_removed": orphans, "evicted": len(removed), "evicted_bytes": sum(e["size"] for e in removed)}
+
+
+def cache_stats():
+    entries = get_backend().list_entries()
+    namespaces = {}
+    for entry in entries:
+        row = namespaces.setdefault(entry["namespace"], {"entries": 0, "bytes": 0, "hits": 0})
+        row["entries"] += 1
+        row["bytes"] += entry["size"]
+        row["hits"] += entry["hits"]
+    return {
+        "backend": CACHE_BACKEND,
+        "entries": len(entries),
+        "bytes": sum(entry["size"] for entry in entries),
+        "max_bytes": MAX_CACHE_BYTES,
+        "policy": EVICTION_POLICY,
+        "namespaces": namespaces,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect and compact the API response cache.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="show entry counts and bytes per namespace")
+    compact_cmd = sub.add_parser("compact", help="drop orphans and evict down to the byte budget")
+    compact_cmd.add_argument("--max-bytes", type=int, default=None)
+    compact_cmd.add_argument("--policy", choices=("lru", "lfu"), default=None)
+    args = parser.parse_args(argv)
+
+    if args.command == "stats":
+        stats = cache_stats()
+        print(
+            f"{stats['entries']} entries, {stats['bytes']:,} / {stats['max_bytes']:,} bytes "
+            f"({stats['backend']}, {stats['policy']})"
+        )
+        for namespace, row in sorted(stats["namespaces"].items()):
+            quota = NAMESPACE_QUOTAS.get(namespace)
+            quota_text = f" / {quota:,}" if quota else ""
+            print(f"  {namespace}: {row['entries']} entries, {row['bytes']:,}{quota_text} bytes, {row['hits']} hits")
+    else:
+        result = compact(max_bytes=args.max_bytes, policy=args.policy)
+        print(
+            f"Removed {result['orphans_removed']} orphaned files, "
+            f"evicted {result['evicted']} entries ({result['evicted_bytes']:,} bytes)"
+        )
+
+
+if __name__ == "__main__":
+    main()
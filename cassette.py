@@ -0,0 +1,191 @@
+"""Record/replay HTTP cassettes for offline, reproducible pipeline runs.
+
+API_HTTP_MODE selects the transport mounted on the shared api_utils session:
+  live    real network (default)
+  record  real network, and responses are saved to the cassette dir; a
+          failed response (not 2xx) never replaces a successful recording
+  replay  no network: responses come from the cassette dir
+
+In replay mode the adapter acts as a local upstream stand-in with tunable
+behavior, so retry, rate-limit and concurrency changes can be benchmarked
+deterministically:
+  API_REPLAY_LATENCY        seconds per response, or a "min-max" range
+  API_REPLAY_ERROR_RATE     fraction of requests answered with an error
+  API_REPLAY_ERROR_STATUSES comma-separated statuses to inject (429,503)
+  API_REPLAY_SEED           seed for latency and error sampling
+"""
+
+import base64
+import hashlib
+import http.client
+import json
+import os
+import random
+import threading
+import time
+from datetime import timedelta
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+HTTP_MODE = os.getenv("API_HTTP_MODE", "live")
+CASSETTE_DIR = Path(os.getenv("API_CASSETTE_DIR", "data/cassettes"))
+
+REPLAY_LATENCY = os.getenv("API_REPLAY_LATENCY", "0")
+REPLAY_ERROR_RATE = float(os.getenv("API_REPLAY_ERROR_RATE", "0"))
+REPLAY_ERROR_STATUSES = [int(s) for s in os.getenv("API_REPLAY_ERROR_STATUSES", "429,503").split(",") if s.strip()]
+REPLAY_SEED = os.getenv("API_REPLAY_SEED")
+
+# Response headers worth keeping; everything else is transport noise.
+RECORDED_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Retry-After", "Cache-Control")
+
+
+def interaction_path(cassette_dir, method, url):
+    from api_utils import canonical_request_key
+
+    key = f"{method.upper()} {canonical_request_key(url)}"
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:20]
+    host = urlsplit(url).hostname or "unknown"
+    return Path(cassette_dir) / host / f"{digest}.json"
+
+
+def _recorded_status(path):
+    try:
+        return json.loads(path.read_text(encoding="utf-8")).get("status")
+    except (OSError, ValueError):
+        return None
+
+
+def save_interaction(cassette_dir, request, response):
+    """Write the response to the cassette. Returns False when it was an error
+    and the request already has a successful recording, which is kept: a 429
+    or 5xx met while recording must not be what every replay serves."""
+    from api_utils import canonical_request_key
+
+    path = interaction_path(cassette_dir, request.method, request.url)
+    if not 200 <= response.status_code < 300 and 200 <= (_recorded_status(path) or 0) < 300:
+        return False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    content = response.content or b""
+    try:
+        body = {"body": content.decode("utf-8")}
+    except UnicodeDecodeError:
+        body = {"body_b64": base64.b64encode(content).decode("ascii")}
+    record = {
+        "method": request.method,
+        "url": canonical_request_key(request.url),
+        "status": response.status_code,
+        "headers": {name: response.headers[name] for name in RECORDED_HEADERS if name in response.headers},
+        "recorded_at": time.time(),
+        **body,
+    }
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_text(json.dumps(record), encoding="utf-8")
+    os.replace(tmp, path)
+    return True
+
+
+def _parse_latency(spec):
+    low, _, high = str(spec).partition("-")
+    low = float(low or 0)
+    return low, float(high) if high else low
+
+
+class RecordingAdapter(HTTPAdapter):
+    """HTTPAdapter that writes the responses it receives to a cassette."""
+
+    def __init__(self, cassette_dir=CASSETTE_DIR, **kwargs):
+        self.cassette_dir = Path(cassette_dir)
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        # Always record a full body, even when the response cache holds validators.
+        request.headers.pop("If-None-Match", None)
+        request.headers.pop("If-Modified-Since", None)
+        response = super().send(request, **kwargs)
+        save_interaction(self.cassette_dir, request, response)
+        return response
+
+
+class ReplayAdapter(BaseAdapter):
+    """Serve recorded responses with optional latency and error injection."""
+
+    def __init__(
+        self,
+        cassette_dir=CASSETTE_DIR,
+        latency=REPLAY_LATENCY,
+        error_rate=REPLAY_ERROR_RATE,
+        error_statuses=None,
+        seed=REPLAY_SEED,
+    ):
+        super().__init__()
+        self.cassette_dir = Path(cassette_dir)
+        self.latency = _parse_latency(latency)
+        self.error_rate = error_rate
+        self.error_statuses = error_statuses or REPLAY_ERROR_STATUSES
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        with self._random_lock:
+            delay = self._random.uniform(*self.latency)
+            inject = self.error_rate > 0 and self._random.random() < self.error_rate
+            status = self._random.choice(self.error_statuses) if inject else None
+
+        read_timeout = timeout[1] if isinstance(timeout, tuple) else timeout
+        if read_timeout is not None and delay > read_timeout:
+            time.sleep(read_timeout)
+            raise requests.Timeout(f"Replay latency {delay:.2f}s exceeded timeout for {request.url}")
+        time.sleep(delay)
+
+        if status is not None:
+            headers = {"Retry-After": "1"} if status == 429 else {}
+            return self._build_response(request, status, headers, b"", delay)
+
+        path = interaction_path(self.cassette_dir, request.method, request.url)
+        if not path.exists():
+            raise requests.ConnectionError(f"No cassette entry for {request.method} {request.url}")
+        record = json.loads(path.read_text(encoding="utf-8"))
+        headers = record.get("headers", {})
+
+        etag = headers.get("ETag")
+        if etag and request.headers.get("If-None-Match") == etag:
+            return self._build_response(request, 304, headers, b"", delay)
+
+        if "body_b64" in record:
+            content = base64.b64decode(record["body_b64"])
+        else:
+            content = record.get("body", "").encode("utf-8")
+        return self._build_response(request, record.get("status", 200), headers, content, delay)
+
+    def _build_response(self, request, status, headers, content, delay):
+        response = requests.Response()
+        response.status_code = status
+        response.reason = http.client.responses.get(status, "")
+        response.headers = CaseInsensitiveDict(headers)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = content
+        response.url = request.url
+        response.request = request
+        response.elapsed = timedelta(seconds=delay)
+        response.connection = self
+        return response
+
+    def close(self):
+        pass
+
+
+def make_adapter(pool_connections, pool_maxsize, mode=None):
+    """Transport adapter for the configured HTTP mode."""
+    mode = mode or HTTP_MODE
+    if mode == "replay":
+        return ReplayAdapter()
+    if mode == "record":
+        return RecordingAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+    if mode != "live":
+        raise ValueError(f"Unknown API_HTTP_MODE: {mode}")
+    return HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
@@ -0,0 +1,120 @@
+"""Transparent gzip/zstd compression for cache bodies and data snapshots.
+
+The codec is chosen by name ("gzip", "zstd" or "none"). zstd needs the
+optional zstandard package and falls back to gzip when it is missing.
+Readers detect the codec from the file suffix or the payload magic bytes,
+so files written with any codec stay readable after the setting changes.
+"""
+
+import gzip
+import io
+import json
+import os
+import zlib
+from pathlib import Path
+
+DATA_COMPRESSION = os.getenv("DATA_COMPRESSION", "gzip")
+DATA_COMPRESSION_LEVEL = int(os.getenv("DATA_COMPRESSION_LEVEL", "6"))
+
+SUFFIXES = {"gzip": ".gz", "zstd": ".zst", "none": ""}
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+_zstandard = None
+
+
+def _zstd():
+    """The zstandard module, imported on first use; None when it is not installed."""
+    global _zstandard
+    if _zstandard is None:
+        try:
+            import zstandard
+        except ImportError:
+            zstandard = False
+        _zstandard = zstandard
+    return _zstandard or None
+
+
+def resolve_codec(codec=None):
+    codec = (codec or DATA_COMPRESSION).lower()
+    if codec not in SUFFIXES:
+        raise ValueError(f"Unknown compression codec: {codec}")
+    if codec == "zstd" and _zstd() is None:
+        return "gzip"
+    return codec
+
+
+def codec_from_path(path):
+    suffix = Path(path).suffix
+    for codec, codec_suffix in SUFFIXES.items():
+        if codec_suffix and suffix == codec_suffix:
+            return codec
+    return "none"
+
+
+def compress_bytes(data: bytes, codec=None, level=None) -> bytes:
+    codec = resolve_codec(codec)
+    level = DATA_COMPRESSION_LEVEL if level is None else level
+    if codec == "gzip":
+        return gzip.compress(data, compresslevel=level, mtime=0)
+    if codec == "zstd":
+        return _zstd().ZstdCompressor(level=level).compress(data)
+    return data
+
+
+def decompress_bytes(data: bytes) -> bytes:
+    if data.startswith(GZIP_MAGIC):
+        return gzip.decompress(data)
+    if data.startswith(ZSTD_MAGIC):
+        zstandard = _zstd()
+        if zstandard is None:
+            raise RuntimeError("zstd payload found but the zstandard package is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if data[:1] == b"\x78":
+        try:
+            return zlib.decompress(data)
+        except zlib.error:
+            pass
+    return data
+
+
+def open_text(path, mode="rt", codec=None, level=None):
+    """Open a possibly compressed text file for streaming reads or writes.
+
+    Reads pick the codec from the file suffix; writes use the given codec
+    (the caller is responsible for the matching suffix).
+    """
+    path = Path(path)
+    codec = codec_from_path(path) if "r" in mode else resolve_codec(codec)
+    level = DATA_COMPRESSION_LEVEL if level is None else level
+    binary_mode = mode.replace("t", "") + ("b" if "b" not in mode else "")
+
+    if codec == "gzip":
+        return gzip.open(path, mode if "t" in mode else mode + "t", compresslevel=level, encoding="utf-8")
+    if codec == "zstd":
+        zstandard = _zstd()
+        if zstandard is None:
+            raise RuntimeError(f"{path} is zstd-compressed but the zstandard package is not installed")
+        handle = open(path, binary_mode)
+        if "r" in mode:
+            stream = zstandard.ZstdDecompressor().stream_reader(handle, closefd=True)
+        else:
+            stream = zstandard.ZstdCompressor(level=level).stream_writer(handle, closefd=True)
+        return io.TextIOWrapper(stream, encoding="utf-8")
+    return open(path, mode.replace("t", ""), encoding="utf-8")
+
+
+def write_json(path, payload, codec=None, level=None):
+    """Write compact JSON, appending the codec suffix. Returns the written path."""
+    codec = resolve_codec(codec)
+    path = Path(path)
+    target = path.with_name(path.name + SUFFIXES[codec])
+    with open_text(target, "wt", codec=codec, level=level) as handle:
+        json.dump(payload, handle, separators=(",", ":"), default=str)
+    return target
+
+
+def read_json(path):
+    with open_text(path, "rt") as handle:
+        return json.load(handle)
@@ -1,43 +1,80 @@
-﻿import json
-import time
+﻿import time
 from datetime import UTC, datetime
 from pathlib import Path
 
-import yfinance as yf
-
-from api_utils import fetch_json_with_cache
+from api_utils import fetch_batch
+from compressed_io import write_json
+from universe import assets
 
 DATA_DIR = Path("data")
-DATA_DIR.mkdir(exist_ok=True)
+HISTORY_COLUMNS = ("Open", "High", "Low", "Close", "Volume")
 
 NOW = datetime.now(UTC).isoformat()
 
-STOCKS = ["AAPL", "MSFT", "TSLA"]
-CRYPTO = ["bitcoin", "ethereum"]
-COMMODITIES = ["GC=F", "CL=F"]  # Gold, Oil
-
 
 def fetch_stock(ticker):
+    """Snapshot referencing the last year of daily bars, downloading only bars the store lacks."""
+    import yfinance as yf
+
+    from history_store import DAY, append_rows, last_timestamp, read_series
+
     t = yf.Ticker(ticker)
-    hist = t.history(period="1y")
+    since = last_timestamp("yfinance_daily", ticker)
+    if since is None:
+        hist = t.history(period="1y")
+    else:
+        # Start at the newest stored day so a partial session gets its final bar.
+        hist = t.history(start=datetime.fromtimestamp(since, UTC).strftime("%Y-%m-%d"))
+    if not hist.empty:
+        rows = {"timestamp": [ts.timestamp() for ts in hist.index]}
+        for column in HISTORY_COLUMNS:
+            rows[column.lower()] = hist[column].astype(float).tolist()
+        append_rows("yfinance_daily", ticker, rows)
+
+    # The snapshot points at the stored bars instead of embedding them;
+    # analysis.py maps the column files directly.
+    timestamps = read_series("yfinance_daily", ticker, (), since=time.time() - 365 * DAY)["timestamp"]
+    series = None
+    if len(timestamps):
+        series = {
+            "source": "yfinance_daily",
+            "name": ticker,
+            "since": float(timestamps[0]),
+            "until": float(timestamps[-1]),
+            "rows": len(timestamps),
+        }
     info = t.info if hasattr(t, "info") else {}
     return {
         "type": "stock",
         "ticker": ticker,
         "info": info,
-        "history": hist.reset_index().to_dict("records"),
+        "history_series": series,
         "fetched_at": NOW,
     }
 
 
-def fetch_crypto(coin):
-    url = f"https://api.coingecko.com/api/v3/coins/{coin}"
-    payload, source = fetch_json_with_cache(
-        url,
-        namespace="coingecko_coin",
-        cache_key=f"coin_{coin}",
-        retries=5,
-    )
+# Same params as analysis_longterm.get_crypto_details, so both stages share
+# one cache entry (and one in-flight request) per coin.
+COIN_PARAMS = {
+    "localization": "false",
+    "tickers": "false",
+    "market_data": "true",
+    "community_data": "true",
+    "developer_data": "true",
+    "sparkline": "false",
+}
+
+
+def crypto_request(coin):
+    return {
+        "url": f"https://api.coingecko.com/api/v3/coins/{coin}",
+        "params": COIN_PARAMS,
+        "namespace": "coingecko_coin",
+        "retries": 5,
+    }
+
+
+def crypto_record(coin, payload, source):
     return {
         "type": "crypto",
         "id": coin,
@@ -48,33 +85,35 @@ def fetch_crypto(coin):
     }
 
 
-results = []
+def main():
+    DATA_DIR.mkdir(exist_ok=True)
+    results = []
 
-for s in STOCKS:
-    try:
-        results.append(fetch_stock(s))
-        time.sleep(1)
-    except Exception as e:
-        print("Stock error:", s, e)
+    for s in (a.symbol for a in assets("raw_snapshot", asset_type="equity")):
+        try:
+            results.append(fetch_stock(s))
+            time.sleep(1)
+        except Exception as e:
+            print("Stock error:", s, e)
 
-for c in CRYPTO:
-    try:
-        results.append(fetch_crypto(c))
-        time.sleep(1)
-    except Exception as e:
-        print("Crypto error:", c, e)
+    crypto = [a.id for a in assets("raw_snapshot", market_type="crypto")]
+    for c, fetched in zip(crypto, fetch_batch([crypto_request(c) for c in crypto])):
+        if isinstance(fetched, Exception):
+            print("Crypto error:", c, fetched)
+            continue
+        results.append(crypto_record(c, *fetched))
 
-for com in COMMODITIES:
-    try:
-        results.append(fetch_stock(com))
-        time.sleep(1)
-    except Exception as e:
-        print("Commodity error:", com, e)
+    for com in (a.symbol for a in assets("raw_snapshot", asset_type="commodity")):
+        try:
+            results.append(fetch_stock(com))
+            time.sleep(1)
+        except Exception as e:
+            print("Commodity error:", com, e)
 
-filename = DATA_DIR / f"raw_{datetime.now(UTC).strftime('%Y%m%d')}.json"
-with open(filename, "w", encoding="utf-8") as f:
-    json.dump(results, f, indent=2)
+    filename = write_json(DATA_DIR / f"raw_{datetime.now(UTC).strftime('%Y%m%d')}.json", results)
 
-print("Saved", filename)
+    print("Saved", filename)
 
 
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""In-process registry of per-request fetch telemetry.
+
+api_utils records one row per fetch call: host, namespace, final status,
+attempts, time slept in backoff and rate-limit waits, time to first byte,
+total latency, body size and cache outcome. When API_METRICS_DIR is set,
+the rows and a per-host summary are written there as JSON and CSV when the
+process exits; dump_metrics() writes them on demand. Error messages are
+recorded without the query strings of the URLs in them, which can carry API
+keys (requests puts the full URL or path in its exception messages).
+"""
+
+import atexit
+import csv
+import json
+import math
+import os
+import re
+import threading
+import time
+from datetime import UTC, datetime
+from pathlib import Path
+
+METRICS_DIR = os.getenv("API_METRICS_DIR", "")
+
+FIELDS = (
+    "started_at",
+    "host",
+    "namespace",
+    "key",
+    "outcome",
+    "status",
+    "attempts",
+    "sleep_s",
+    "rate_wait_s",
+    "ttfb_ms",
+    "elapsed_ms",
+    "bytes",
+    "error",
+)
+
+# A query string with at least one parameter, up to whitespace or a quote.
+QUERY_STRING = re.compile(r"\?[^\s'\"<>?]*=[^\s'\"<>]*")
+
+_records = []
+_lock = threading.Lock()
+
+
+def scrub_query_strings(text):
+    """Text with every URL query string in it removed."""
+    return QUERY_STRING.sub("", text)
+
+
+def record_fetch(**fields):
+    row = {name: fields.get(name) for name in FIELDS}
+    row["started_at"] = row["started_at"] or time.time()
+    if row["error"]:
+        row["error"] = scrub_query_strings(str(row["error"]))
+    with _lock:
+        _records.append(row)
+
+
+def get_records():
+    with _lock:
+        return list(_records)
+
+
+def reset_metrics():
+    with _lock:
+        _records.clear()
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of a list of numbers (None when empty)."""
+    ordered = sorted(v for v in values if v is not None)
+    if not ordered:
+        return None
+    rank = max(1, math.ceil(q / 100.0 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize(records=None):
+    """Per-host latency percentiles, byte and sleep totals, and outcome counts."""
+    records = get_records() if records is None else records
+    by_host = {}
+    for row in records:
+        by_host.setdefault(row["host"] or "unknown", []).append(row)
+
+    summary = {}
+    for host, rows in sorted(by_host.items()):
+        elapsed = [row["elapsed_ms"] for row in rows]
+        ttfb = [row["ttfb_ms"] for row in rows]
+        outcomes = {}
+        for row in rows:
+            outcomes[row["outcome"]] = outcomes.get(row["outcome"], 0) + 1
+        summary[host] = {
+            "requests": len(rows),
+            "attempts": sum(row["attempts"] or 0 for row in rows),
+            "bytes": sum(row["bytes"] or 0 for row in rows),
+            "sleep_s": round(sum(row["sleep_s"] or 0 for row in rows), 3),
+            "rate_wait_s": round(sum(row["rate_wait_s"] or 0 for row in rows), 3),
+            "elapsed_ms": {f"p{q}": percentile(elapsed, q) for q in (50, 90, 99)},
+            "ttfb_ms": {f"p{q}": percentile(ttfb, q) for q in (50, 90, 99)},
+            "outcomes": outcomes,
+        }
+    return summary
+
+
+def dump_metrics(out_dir=None, stem=None):
+    """Write fetch_metrics_<stamp>.json (rows + summary) and .csv. Returns the JSON path."""
+    records = get_records()
+    out_dir = Path(out_dir or METRICS_DIR or "data/metrics")
+    out_dir.mkdir(parents=True, exist_ok=True)
+    stem = stem or f"fetch_metrics_{datetime.now(UTC).strftime('%Y%m%dT%H%M%S')}_{os.getpid()}"
+
+    json_file = out_dir / f"{stem}.json"
+    json_file.write_text(
+        json.dumps({"records": records, "summary": summarize(records)}, indent=2),
+        encoding="utf-8",
+    )
+    with open(out_dir / f"{stem}.csv", "w", newline="", encoding="utf-8") as handle:
+        writer = csv.DictWriter(handle, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(records)
+    return json_file
+
+
+def _dump_at_exit():
+    if METRICS_DIR and get_records():
+        print("Saved", dump_metrics())
+
+
+atexit.register(_dump_at_exit)
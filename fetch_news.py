@@ -3,7 +3,8 @@ from datetime import UTC, datetime
 from pathlib import Path
 from xml.etree import ElementTree
 
-from api_utils import fetch_text_with_cache
+from api_utils import fetch_batch
+from build_manifest import write_if_changed
 
 DATA_DIR = Path("data")
 DATA_DIR.mkdir(exist_ok=True)
@@ -41,20 +42,20 @@ def parse_items(xml_text, source_name):
 def generate_news_snapshot():
     all_items = []
 
-    for feed in FEEDS:
-        try:
-            xml_text, source_mode = fetch_text_with_cache(
-                feed["url"],
-                namespace="news_feed",
-                cache_key=feed["url"],
-                retries=5,
-            )
-            parsed = parse_items(xml_text, feed["name"])
-            for row in parsed:
-                row["fetch_source"] = source_mode
-            all_items.extend(parsed)
-        except Exception as exc:
-            print(f"News feed error for {feed['name']}: {exc}")
+    batch = [
+        {"url": feed["url"], "kind": "text", "namespace": "news_feed", "retries": 5}
+        for feed in FEEDS
+    ]
+
+    for feed, fetched in zip(FEEDS, fetch_batch(batch)):
+        if isinstance(fetched, Exception):
+            print(f"News feed error for {feed['name']}: {fetched}")
+            continue
+        xml_text, source_mode = fetched
+        parsed = parse_items(xml_text, feed["name"])
+        for row in parsed:
+            row["fetch_source"] = source_mode
+        all_items.extend(parsed)
 
     output = {
         "generated_at": datetime.now(UTC).strftime("%Y-%m-%d %H:%M UTC"),
@@ -63,8 +64,9 @@ def generate_news_snapshot():
     }
 
     out_file = DATA_DIR / "news_latest.json"
-    out_file.write_text(json.dumps(output, indent=2), encoding="utf-8")
-    print("Saved", out_file)
+    if write_if_changed(out_file, json.dumps(output, indent=2)):
+        print("Saved", out_file)
+    return output
 
 
 if __name__ == "__main__":
@@ -4,25 +4,23 @@ import json
 from datetime import UTC, datetime
 from pathlib import Path
 
-from api_utils import fetch_json_with_cache, fetch_text_with_cache
+from api_utils import fetch_batch, fetch_json_with_cache, fetch_text_with_cache
+from build_manifest import write_if_changed
+from universe import assets
 
 DATA_DIR = Path("data")
 DATA_DIR.mkdir(exist_ok=True)
 
-WATCHLIST = {
-    "spy": {"symbol": "SPY", "name": "S&P 500 ETF", "stooq": "spy.us"},
-    "qqq": {"symbol": "QQQ", "name": "Nasdaq 100 ETF", "stooq": "qqq.us"},
-    "nvda": {"symbol": "NVDA", "name": "NVIDIA", "stooq": "nvda.us"},
-    "gold": {"symbol": "GC=F", "name": "Gold Futures", "stooq": "xauusd"},
-    "oil": {"symbol": "CL=F", "name": "Crude Oil Futures", "stooq": "cl.f"},
-}
+BULK_QUOTE_URL = "https://query1.finance.yahoo.com/v7/finance/quote"
+# Symbols per bulk quote request; keeps URLs short for large watchlists.
+BULK_QUOTE_CHUNK = 50
 
 
 def blank_row(asset_id, meta):
     return {
         "asset": asset_id,
-        "symbol": meta["symbol"],
-        "name": meta["name"],
+        "symbol": meta.symbol,
+        "name": meta.name,
         "price": None,
         "change_24h_pct": None,
         "currency": "USD",
@@ -41,7 +39,6 @@ def fetch_chart_quote(symbol):
     payload, source = fetch_json_with_cache(
         url,
         namespace="yahoo_chart",
-        cache_key=f"chart_{symbol}",
         retries=3,
     )
 
@@ -81,7 +78,6 @@ def fetch_stooq_quote(stooq_symbol):
     text, source = fetch_text_with_cache(
         url,
         namespace="stooq_quote",
-        cache_key=f"stooq_{stooq_symbol}",
         retries=3,
     )
 
@@ -111,8 +107,16 @@ def fetch_stooq_quote(stooq_symbol):
 
 
 def fetch_quotes():
-    symbols = ",".join(item["symbol"] for item in WATCHLIST.values())
-    bulk_url = f"https://query1.finance.yahoo.com/v7/finance/quote?symbols={symbols}"
+    watchlist = assets("watchlist_quotes")
+    symbols = [meta.symbol for meta in watchlist]
+    batch = [
+        {
+            "url": f"{BULK_QUOTE_URL}?symbols={','.join(symbols[i:i + BULK_QUOTE_CHUNK])}",
+            "namespace": "yahoo_quote",
+            "retries": 3,
+        }
+        for i in range(0, len(symbols), BULK_QUOTE_CHUNK)
+    ]
 
     out = {
         "generated_at": datetime.now(UTC).isoformat(),
@@ -120,47 +124,45 @@ def fetch_quotes():
         "quotes": {},
     }
 
-    for asset_id, meta in WATCHLIST.items():
-        out["quotes"][asset_id] = blank_row(asset_id, meta)
+    for meta in watchlist:
+        out["quotes"][meta.id] = blank_row(meta.id, meta)
 
     by_symbol = {}
-    bulk_source = None
+    bulk_sources = {}
 
-    try:
-        payload, source = fetch_json_with_cache(
-            bulk_url,
-            namespace="yahoo_quote",
-            cache_key=f"watchlist_{symbols}",
-            retries=3,
-        )
-        by_symbol = parse_bulk_quote(payload)
-        bulk_source = f"yahoo_quote_{source}"
-    except Exception as exc:
-        print(f"Watchlist bulk quote fallback: {exc}")
-
-    for asset_id, meta in WATCHLIST.items():
-        row = by_symbol.get(meta["symbol"], {})
+    for fetched in fetch_batch(batch):
+        if isinstance(fetched, Exception):
+            print(f"Watchlist bulk quote fallback: {fetched}")
+            continue
+        payload, source = fetched
+        rows = parse_bulk_quote(payload)
+        by_symbol.update(rows)
+        bulk_sources.update(dict.fromkeys(rows, f"yahoo_quote_{source}"))
+
+    for meta in watchlist:
+        asset_id = meta.id
+        row = by_symbol.get(meta.symbol, {})
         price = row.get("regularMarketPrice")
         if price is not None:
             out["quotes"][asset_id] = {
                 "asset": asset_id,
-                "symbol": meta["symbol"],
-                "name": meta["name"],
+                "symbol": meta.symbol,
+                "name": meta.name,
                 "price": price,
                 "change_24h_pct": row.get("regularMarketChangePercent"),
                 "currency": row.get("currency") or "USD",
                 "market_time": row.get("regularMarketTime"),
-                "fetch_source": bulk_source or "yahoo_quote_unknown",
+                "fetch_source": bulk_sources.get(meta.symbol) or "yahoo_quote_unknown",
             }
             continue
 
         try:
-            chart = fetch_chart_quote(meta["symbol"])
+            chart = fetch_chart_quote(meta.symbol)
             if chart.get("price") is not None:
                 out["quotes"][asset_id] = {
                     "asset": asset_id,
-                    "symbol": meta["symbol"],
-                    "name": meta["name"],
+                    "symbol": meta.symbol,
+                    "name": meta.name,
                     "price": chart.get("price"),
                     "change_24h_pct": chart.get("change_24h_pct"),
                     "currency": chart.get("currency") or "USD",
@@ -172,12 +174,12 @@ def fetch_quotes():
             pass
 
         try:
-            stooq = fetch_stooq_quote(meta["stooq"])
+            stooq = fetch_stooq_quote(meta.stooq)
             if stooq.get("price") is not None:
                 out["quotes"][asset_id] = {
                     "asset": asset_id,
-                    "symbol": meta["symbol"],
-                    "name": meta["name"],
+                    "symbol": meta.symbol,
+                    "name": meta.name,
                     "price": stooq.get("price"),
                     "change_24h_pct": stooq.get("change_24h_pct"),
                     "currency": stooq.get("currency") or "USD",
@@ -201,8 +203,9 @@ def fetch_quotes():
         out["source"] = "mixed"
 
     out_file = DATA_DIR / "watchlist_quotes.json"
-    out_file.write_text(json.dumps(out, indent=2), encoding="utf-8")
-    print("Saved", out_file)
+    if write_if_changed(out_file, json.dumps(out, indent=2)):
+        print("Saved", out_file)
+    return out
 
 
 if __name__ == "__main__":
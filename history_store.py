@@ -0,0 +1,230 @@
+"""Append-only local price histories, one directory of column files per series.
+
+A series is a provider plus a symbol (coingecko_daily/bitcoin,
+yahoo_monthly/AAPL, ...). It lives under HISTORY_DIR/<source>/<name>/ as one
+raw little-endian float64 file per column (timestamp in Unix seconds, then
+whichever of open, high, low, close, volume and market_cap the provider
+supplies) and a meta.json holding the column list and row count. Readers get
+read-only numpy.memmap views of the column files, so loading a series costs
+neither parsing nor a copy however long it is.
+
+Fetchers ask for the bars after last_timestamp() and append them, so a run
+downloads a few rows instead of the provider's whole window, and the store
+keeps history older than the provider still serves. An append first drops
+stored bars at or after its first timestamp (or replace_from), which is how a
+still-forming daily or monthly bar is replaced by its final value.
+last_per_period() and last_per_month() reduce fetched points to one bar per
+day or month first.
+
+    python history_store.py          # list stored series
+"""
+
+import argparse
+import json
+import os
+import re
+import threading
+import time
+from datetime import UTC, datetime
+from pathlib import Path
+
+import numpy as np
+
+HISTORY_DIR = Path(os.getenv("HISTORY_DIR", "data/history"))
+COLUMNS = ("timestamp", "open", "high", "low", "close", "volume", "market_cap")
+DTYPE = np.dtype("<f8")
+DAY = 86400
+
+_locks = {}
+_locks_lock = threading.Lock()
+
+
+def _series_lock(directory):
+    with _locks_lock:
+        return _locks.setdefault(directory, threading.Lock())
+
+
+def series_dir(source, name):
+    return HISTORY_DIR / source / re.sub(r"[^A-Za-z0-9._-]", "_", name)
+
+
+def load_meta(source, name):
+    try:
+        return json.loads((series_dir(source, name) / "meta.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def last_timestamp(source, name):
+    """Timestamp of the newest stored bar, or None when the series is empty."""
+    return load_meta(source, name).get("last_ts")
+
+
+def _column(directory, column, rows):
+    return np.memmap(directory / f"{column}.f64", dtype=DTYPE, mode="r", shape=(rows,))
+
+
+def read_series(source, name, columns=("close",), since=None, until=None, copy=False):
+    """Stored bars as {"timestamp": array, column: array, ...}, oldest first.
+
+    Stored columns are memory-mapped views. Columns the series does not
+    have come back as NaN; `since` and `until` keep bars within that range
+    of Unix timestamps (inclusive). A missing series gives empty arrays.
+
+    append_rows() rewrites the tail of the column files in place, so a
+    reader that runs alongside a writer of the same series passes copy=True:
+    the bars are then copied out while appends are held off.
+    """
+    directory = series_dir(source, name)
+    if copy:
+        with _series_lock(directory):
+            data = read_series(source, name, columns, since, until)
+            return {column: np.array(values) for column, values in data.items()}
+    meta = load_meta(source, name)
+    rows = meta.get("rows", 0)
+    stored = meta.get("columns", [])
+    data = {}
+    for column in ("timestamp", *columns):
+        if rows and column in stored:
+            data[column] = _column(directory, column, rows)
+        else:
+            data[column] = np.full(rows, np.nan)
+    if since is not None or until is not None:
+        start = 0 if since is None else int(np.searchsorted(data["timestamp"], since))
+        end = rows if until is None else int(np.searchsorted(data["timestamp"], until, side="right"))
+        data = {column: values[start:end] for column, values in data.items()}
+    return data
+
+
+def last_per_period(rows, period=DAY):
+    """Keep the newest bar in each period, labelled by the period's end.
+
+    A point exactly on a boundary closes the period before it, so daily
+    midnight snapshots and intraday points of the previous day fall in the
+    same bucket and yield one close per day. A still-forming period keeps
+    its end as its timestamp while its close moves, so the next fetch
+    replaces that bar rather than adding another.
+    """
+    timestamps = np.asarray(rows["timestamp"], dtype=DTYPE)
+    order = np.argsort(timestamps, kind="stable")
+    buckets = np.ceil(timestamps[order] / period)
+    last = np.append(buckets[1:] != buckets[:-1], True)[: len(buckets)]
+    kept = {column: np.asarray(values, dtype=DTYPE)[order[last]] for column, values in rows.items()}
+    kept["timestamp"] = buckets[last] * period
+    return kept
+
+
+def month_start(ts):
+    """Start of the UTC calendar month holding a Unix timestamp."""
+    return datetime.fromtimestamp(ts, UTC).replace(day=1, hour=0, minute=0, second=0, microsecond=0).timestamp()
+
+
+def last_per_month(rows):
+    """Keep the newest bar of each UTC calendar month, with its own timestamp.
+
+    Monthly providers date a still-forming month by its latest trading day,
+    so successive fetches return it with a moving date; appending with
+    replace_from=month_start() of the stored last bar replaces it.
+    """
+    timestamps = np.asarray(rows["timestamp"], dtype=DTYPE)
+    order = np.argsort(timestamps, kind="stable")
+    months = np.floor(timestamps[order]).astype(np.int64).astype("datetime64[s]").astype("datetime64[M]")
+    keep = order[np.append(months[1:] != months[:-1], True)[: len(months)]]
+    return {column: np.asarray(values, dtype=DTYPE)[keep] for column, values in rows.items()}
+
+
+def append_rows(source, name, rows, replace_from=None):
+    """Append bars given as {column: values} including "timestamp".
+
+    Stored bars at or after replace_from or the first new timestamp,
+    whichever is earlier, are replaced. Returns the stored row count.
+    """
+    unknown = sorted(set(rows) - set(COLUMNS))
+    if unknown or "timestamp" not in rows:
+        raise ValueError(f"Bad history columns for {source}/{name}: {', '.join(unknown) or 'no timestamp'}")
+    timestamps = np.asarray(rows["timestamp"], dtype=DTYPE)
+    order = np.argsort(timestamps, kind="stable")
+    new = {column: np.asarray(values, dtype=DTYPE)[order] for column, values in rows.items()}
+    # Several bars with one timestamp: the last one given wins.
+    timestamps = new["timestamp"]
+    unique = np.append(timestamps[1:] != timestamps[:-1], True)[: len(timestamps)]
+    new = {column: values[unique] for column, values in new.items()}
+    count = len(new["timestamp"])
+
+    directory = series_dir(source, name)
+    with _series_lock(directory):
+        meta = load_meta(source, name)
+        stored = meta.get("rows", 0)
+        if not count:
+            return stored
+        old_columns = meta.get("columns", [])
+        columns = [c for c in COLUMNS if c in old_columns or c in new]
+
+        keep = stored
+        if stored:
+            cutoff = new["timestamp"][0] if replace_from is None else min(replace_from, new["timestamp"][0])
+            keep = int(np.searchsorted(_column(directory, "timestamp", stored), cutoff))
+
+        directory.mkdir(parents=True, exist_ok=True)
+        for column in columns:
+            path = directory / f"{column}.f64"
+            values = new.get(column)
+            if values is None:
+                values = np.full(count, np.nan)
+            with open(path, "r+b" if path.exists() else "wb") as handle:
+                if column in old_columns:
+                    handle.seek(keep * DTYPE.itemsize)
+                else:
+                    np.full(keep, np.nan).tofile(handle)
+                # Overwrite in place and only then cut off what is left, so
+                # mapped views of the older bars never point past the file end.
+                values.tofile(handle)
+                handle.truncate()
+
+        total = keep + count
+        first_ts = meta.get("first_ts") if keep else float(new["timestamp"][0])
+        meta = {
+            "source": source,
+            "name": name,
+            "columns": columns,
+            "rows": total,
+            "first_ts": first_ts,
+            "last_ts": float(new["timestamp"][-1]),
+            "updated_at": time.time(),
+        }
+        # Column files may run past "rows" if a write is interrupted; readers
+        # and the next append only trust the count recorded here.
+        tmp = directory / f"meta.json.{os.getpid()}.{threading.get_ident()}.tmp"
+        tmp.write_text(json.dumps(meta, indent=2), encoding="utf-8")
+        os.replace(tmp, directory / "meta.json")
+    return total
+
+
+def list_series():
+    rows = []
+    for meta_file in sorted(HISTORY_DIR.glob("*/*/meta.json")):
+        try:
+            rows.append(json.loads(meta_file.read_text(encoding="utf-8")))
+        except (OSError, ValueError):
+            continue
+    return rows
+
+
+def _date(ts):
+    return datetime.fromtimestamp(ts, UTC).strftime("%Y-%m-%d") if ts is not None else "-"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="List the stored price histories.")
+    parser.parse_args(argv)
+    series = list_series()
+    for meta in series:
+        print(
+            f"{meta['source']}/{meta['name']}: {meta['rows']} bars "
+            f"{_date(meta.get('first_ts'))} .. {_date(meta.get('last_ts'))} ({', '.join(meta['columns'][1:])})"
+        )
+    print(f"{len(series)} series in {HISTORY_DIR}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""Streaming indicators over a close series, updated in O(1) per bar.
+
+IndicatorState keeps the newest closes in a ring buffer next to running
+aggregates: one sum per moving-average window, gain and loss sums over the
+last RSI_PERIOD price changes, and a Welford mean/M2 over the last VOL_WINDOW
+percentage returns. push() adds a bar and revise() replaces the newest one (a
+still-forming daily or monthly bar); neither looks at older bars. Once per lap
+of the ring the aggregates are recomputed exactly, so rounding drift from
+adding and removing values cannot build up.
+
+The definitions follow analysis.py and analysis_shortterm.py: moving averages
+use the bars available while there are fewer than the window, RSI is the
+ratio of simple (not Wilder-smoothed) average gain and loss and is 0 while
+the window has no losses, and volatility is the sample standard deviation of
+daily % returns.
+
+update_from_store() keeps one state per history_store series, saved as
+indicators.json in the series directory, and feeds it only the bars stored
+since its last call.
+"""
+
+import json
+import math
+import os
+import threading
+
+from history_store import read_series, series_dir
+
+SMA_WINDOWS = (50, 200)
+RSI_PERIOD = 14
+VOL_WINDOW = 30
+STATE_FILE = "indicators.json"
+
+
+class IndicatorState:
+    CONFIG = ("sma_windows", "rsi_period", "vol_window")
+
+    def __init__(self, sma_windows=SMA_WINDOWS, rsi_period=RSI_PERIOD, vol_window=VOL_WINDOW):
+        self.sma_windows = tuple(sma_windows)
+        self.rsi_period = rsi_period
+        self.vol_window = vol_window
+        # One slot more than the longest lookback, so the newest bar can be undone.
+        self.capacity = max(*self.sma_windows, rsi_period + 1, vol_window + 1) + 1
+        self.ring = [0.0] * self.capacity
+        self.count = 0
+        self.last_ts = None
+        self.sums = [0.0] * len(self.sma_windows)
+        self.gain = self.loss = 0.0
+        self.gains = self.losses = 0
+        self.ret_mean = self.ret_m2 = 0.0
+        self.moves = 0
+
+    def close(self, lag=0):
+        """Close `lag` bars before the newest one."""
+        return self.ring[(self.count - 1 - lag) % self.capacity]
+
+    def _change(self, lag):
+        return self.close(lag) - self.close(lag + 1)
+
+    def _return(self, lag):
+        return (self.close(lag) / self.close(lag + 1) - 1) * 100
+
+    def _count_change(self, change, sign):
+        if change > 0:
+            self.gains += sign
+            self.gain = self.gain + sign * change if self.gains else 0.0
+        elif change < 0:
+            self.losses += sign
+            self.loss = self.loss - sign * change if self.losses else 0.0
+
+    def _add_return(self, value, n):
+        self.moves += value != 0
+        delta = value - self.ret_mean
+        self.ret_mean += delta / n
+        self.ret_m2 += delta * (value - self.ret_mean)
+
+    def _remove_return(self, value, n):
+        self.moves -= value != 0
+        # A window of unchanged closes has exactly zero variance, not leftovers.
+        if n == 0 or not self.moves:
+            self.ret_mean = self.ret_m2 = 0.0
+            return
+        delta = value - self.ret_mean
+        self.ret_mean -= delta / n
+        self.ret_m2 -= delta * (value - self.ret_mean)
+
+    def push(self, close, ts=None):
+        """Add a bar."""
+        self.count += 1
+        self.ring[(self.count - 1) % self.capacity] = close
+        for idx, window in enumerate(self.sma_windows):
+            self.sums[idx] += close
+            if self.count > window:
+                self.sums[idx] -= self.close(window)
+        if self.count >= 2:
+            self._count_change(self._change(0), 1)
+            if self.count - 1 > self.rsi_period:
+                self._count_change(self._change(self.rsi_period), -1)
+            if self.count - 1 > self.vol_window:
+                self._remove_return(self._return(self.vol_window), self.vol_window - 1)
+            self._add_return(self._return(0), min(self.count - 1, self.vol_window))
+        self.last_ts = ts
+        if self.count % self.capacity == 0:
+            self.resync()
+
+    def _pop(self):
+        """Undo the newest push; the bars that left each window are still in the ring."""
+        if self.count >= 2:
+            self._remove_return(self._return(0), min(self.count - 1, self.vol_window) - 1)
+            if self.count - 1 > self.vol_window:
+                self._add_return(self._return(self.vol_window), self.vol_window)
+            self._count_change(self._change(0), -1)
+            if self.count - 1 > self.rsi_period:
+                self._count_change(self._change(self.rsi_period), 1)
+        for idx, window in enumerate(self.sma_windows):
+            self.sums[idx] -= self.close(0)
+            if self.count > window:
+                self.sums[idx] += self.close(window)
+        self.count -= 1
+
+    def revise(self, close, ts=None):
+        """Replace the newest bar."""
+        if self.count:
+            self._pop()
+        self.push(close, ts)
+
+    def extend(self, timestamps, closes):
+        """Push bars in order; a missing close repeats the previous one."""
+        for ts, close in zip(timestamps, closes):
+            if close != close:
+                if not self.count:
+                    continue
+                close = self.close()
+            self.push(close, ts)
+
+    def resync(self):
+        """Recompute every aggregate from the ring."""
+        closes = [self.close(lag) for lag in range(min(self.count, self.capacity))]
+        self.sums = [math.fsum(closes[:window]) for window in self.sma_windows]
+        changes = [closes[lag] - closes[lag + 1] for lag in range(min(self.count - 1, self.rsi_period))]
+        self.gain = math.fsum(c for c in changes if c > 0)
+        self.loss = math.fsum(-c for c in changes if c < 0)
+        self.gains = sum(1 for c in changes if c > 0)
+        self.losses = sum(1 for c in changes if c < 0)
+        returns = [(closes[lag] / closes[lag + 1] - 1) * 100 for lag in range(min(self.count - 1, self.vol_window))]
+        self.ret_mean = math.fsum(returns) / len(returns) if returns else 0.0
+        self.ret_m2 = math.fsum((r - self.ret_mean) ** 2 for r in returns)
+        self.moves = sum(1 for r in returns if r != 0)
+
+    def sma(self, window):
+        if not self.count:
+            return None
+        return self.sums[self.sma_windows.index(window)] / min(self.count, window)
+
+    def rsi(self):
+        periods = min(self.count - 1, self.rsi_period)
+        if periods <= 0 or not self.losses:
+            return 0.0
+        return 100 - (100 / (1 + (self.gain / periods) / (self.loss / periods)))
+
+    def return_stdev(self):
+        """Sample standard deviation of the last vol_window daily % returns."""
+        n = min(self.count - 1, self.vol_window)
+        if n < 2:
+            return None
+        return math.sqrt(max(self.ret_m2, 0.0) / (n - 1))
+
+    def change_pct(self, lag):
+        """% change of the newest close against the close `lag` bars earlier."""
+        if self.count <= lag:
+            return None
+        return (self.close() / self.close(lag) - 1) * 100
+
+    def to_dict(self):
+        return {name: value for name, value in vars(self).items() if name != "capacity"}
+
+    @classmethod
+    def from_dict(cls, data, **config):
+        """Restore a saved state; None when it was saved with other settings."""
+        state = cls(**config)
+        saved = (tuple(data.get("sma_windows", ())), data.get("rsi_period"), data.get("vol_window"))
+        if saved != (state.sma_windows, state.rsi_period, state.vol_window):
+            return None
+        if len(data.get("ring", ())) != state.capacity:
+            return None
+        for name, value in data.items():
+            if name not in cls.CONFIG:
+                setattr(state, name, value)
+        return state
+
+
+_locks = {}
+_locks_lock = threading.Lock()
+
+
+def _state_lock(path):
+    with _locks_lock:
+        return _locks.setdefault(path, threading.Lock())
+
+
+def load_state(source, name, **config):
+    """Saved IndicatorState of a series, or None when there is none for these settings."""
+    try:
+        data = json.loads((series_dir(source, name) / STATE_FILE).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    return IndicatorState.from_dict(data, **config)
+
+
+def _save_state(path, state):
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_text(json.dumps(state.to_dict()), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def update_from_store(source, name, **config):
+    """Bring the series' IndicatorState up to date with its stored closes and save it.
+
+    Only bars from the last one the state has seen onwards are read: that bar
+    is revised if its close changed and newer bars are pushed. If the store
+    no longer has that bar (rewritten history), the state is rebuilt from the
+    newest bars, which is all any window needs. Returns the state; its
+    count is 0 when the series has no closes.
+    """
+    path = series_dir(source, name) / STATE_FILE
+    with _state_lock(path):
+        state = load_state(source, name, **config)
+        changed = False
+        if state is not None and state.count:
+            bars = read_series(source, name, ("close",), since=state.last_ts, copy=True)
+            timestamps, closes = bars["timestamp"].tolist(), bars["close"].tolist()
+            if timestamps and timestamps[0] == state.last_ts:
+                if closes[0] == closes[0] and closes[0] != state.close():
+                    state.revise(closes[0], timestamps[0])
+                    changed = True
+                if len(timestamps) > 1:
+                    state.extend(timestamps[1:], closes[1:])
+                    changed = True
+            else:
+                state = None
+        if state is None or not state.count:
+            state = IndicatorState(**config)
+            bars = read_series(source, name, ("close",), copy=True)
+            start = max(0, len(bars["timestamp"]) - state.capacity)
+            state.extend(bars["timestamp"][start:].tolist(), bars["close"][start:].tolist())
+            changed = bool(state.count)
+        if changed:
+            _save_state(path, state)
+    return state
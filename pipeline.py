@@ -0,0 +1,230 @@
+"""Run the daily stages as one DAG in a single process.
+
+Each stage declares the upstream stages it reads and the files it writes.
+Results are handed to downstream stages in memory, and stages whose inputs
+are ready run concurrently. Any stage can be re-run alone with --only; inputs
+from stages that are not part of the run are read back from disk.
+
+Stages whose code, upstream files and cache entries are unchanged since the
+last run (see build_manifest.py) are skipped; --force runs them anyway.
+
+API_FETCH_BUDGET (or --fetch-budget) caps the wall-clock seconds the run may
+spend fetching, counted from when the stages start; after that, fetches are
+served from the cache.
+
+    python pipeline.py
+    python pipeline.py --only watchlist_quotes asset_snapshots
+"""
+
+import argparse
+import ast
+import contextvars
+import importlib
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from functools import lru_cache
+from pathlib import Path
+
+from api_utils import cache_reads_current, fetch_deadline, track_cache_reads, wait_for_refreshes
+from build_manifest import combined_hash, file_hash, load_manifest, save_manifest
+
+ROOT = Path(__file__).resolve().parent
+
+# run is "module:function", imported only when the stage runs, so a run of a
+# few stages does not load the others' dependencies. inputs map a keyword
+# argument of the stage function to an upstream stage; files lists other
+# files the stage reads.
+STAGES = {
+    "long_term": {
+        "run": "analysis_longterm:generate_report",
+        "inputs": {},
+        "files": ["data/universe.json"],
+        "outputs": ["reports/long_term/", "data/results/long_term/"],
+    },
+    "short_term": {
+        "run": "analysis_shortterm:generate_report",
+        "inputs": {},
+        "files": ["data/universe.json"],
+        "outputs": ["reports/short_term.md", "data/results/short_term.json"],
+    },
+    "news": {
+        "run": "fetch_news:generate_news_snapshot",
+        "inputs": {},
+        "files": [],
+        "outputs": ["data/news_latest.json"],
+    },
+    "watchlist_quotes": {
+        "run": "fetch_watchlist_quotes:fetch_quotes",
+        "inputs": {},
+        "files": ["data/universe.json"],
+        "outputs": ["data/watchlist_quotes.json"],
+    },
+    "asset_snapshots": {
+        "run": "build_asset_snapshots:build_assets",
+        "inputs": {
+            "short_results": "short_term",
+            "long_index": "long_term",
+            "news": "news",
+            "watchlist": "watchlist_quotes",
+        },
+        "files": ["data/universe.json", "data/analysis_latest.json"],
+        "outputs": ["data/assets/"],
+    },
+}
+
+
+def stage_module(name):
+    return STAGES[name]["run"].split(":")[0]
+
+
+def stage_function(name):
+    """The stage's run function, importing its module on first use."""
+    module, function = STAGES[name]["run"].split(":")
+    return getattr(importlib.import_module(module), function)
+
+
+@lru_cache(maxsize=None)
+def _imported_names(path):
+    names = set()
+    for node in ast.walk(ast.parse(path.read_text(encoding="utf-8-sig"))):
+        if isinstance(node, ast.Import):
+            names.update(alias.name.split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and not node.level and node.module:
+            names.add(node.module.split(".")[0])
+    return names
+
+
+def local_modules(module):
+    """Source files of a repo module and of every repo module it imports,
+    directly or through others. Imports are read from the source, so ones
+    deferred into functions count too."""
+    found = {}
+    pending = [module]
+    while pending:
+        name = pending.pop()
+        path = ROOT / f"{name}.py"
+        if name in found or not path.exists():
+            continue
+        found[name] = path
+        pending += _imported_names(path)
+    return [found[name] for name in sorted(found)]
+
+
+def stage_fingerprint(name):
+    """Hash of the code the stage runs (its module and the repo modules it
+    imports), its upstream stages' output files and its other input files."""
+    stage = STAGES[name]
+    parts = [f"{path.name}:{file_hash(path)}" for path in local_modules(stage_module(name))]
+    for upstream in sorted(set(stage["inputs"].values())):
+        parts += [file_hash(path) for path in STAGES[upstream]["outputs"]]
+    parts += [file_hash(path) for path in stage.get("files", [])]
+    return combined_hash(parts)
+
+
+def is_up_to_date(name, fingerprint, entry):
+    if not entry or entry.get("fingerprint") != fingerprint:
+        return False
+    outputs = entry.get("outputs", {})
+    if set(outputs) != set(STAGES[name]["outputs"]):
+        return False
+    if any(file_hash(path) != digest for path, digest in outputs.items()):
+        return False
+    return cache_reads_current(entry.get("reads", []))
+
+
+def run_stage(name, results):
+    stage = STAGES[name]
+    kwargs = {arg: results[upstream] for arg, upstream in stage["inputs"].items() if upstream in results}
+    started = time.perf_counter()
+    with track_cache_reads() as reads:
+        result = stage_function(name)(**kwargs)
+    print(f"[pipeline] {name} finished in {time.perf_counter() - started:.1f}s")
+    return result, reads
+
+
+def run_pipeline(only=None, max_workers=None, force=False, fetch_budget=None):
+    """Run the selected stages (all by default). Returns (results, failed stage names).
+
+    Skipped (unchanged) stages have no entry in results; their dependants read
+    the files on disk instead. All fetching in the stages shares one deadline
+    of fetch_budget seconds (default API_FETCH_BUDGET; no deadline when unset).
+    """
+    selected = list(only or STAGES)
+    unknown = [name for name in selected if name not in STAGES]
+    if unknown:
+        raise ValueError(f"Unknown stages: {', '.join(unknown)}")
+
+    deps = {name: {up for up in STAGES[name]["inputs"].values() if up in selected} for name in selected}
+    manifest = load_manifest()
+    fingerprints = {}
+    results = {}
+    failed = set()
+    done = set()
+    running = {}
+    if fetch_budget is None and os.getenv("API_FETCH_BUDGET"):
+        fetch_budget = float(os.getenv("API_FETCH_BUDGET"))
+    deadline = fetch_deadline(fetch_budget) if fetch_budget else nullcontext()
+
+    with deadline, ThreadPoolExecutor(max_workers=max_workers or len(selected)) as pool:
+        while len(done) < len(selected):
+            for name in selected:
+                if name in done or name in running.values() or not deps[name] <= done:
+                    continue
+                if deps[name] & failed:
+                    print(f"[pipeline] {name} skipped: upstream failed")
+                    failed.add(name)
+                    done.add(name)
+                    continue
+                fingerprints[name] = stage_fingerprint(name)
+                if not force and is_up_to_date(name, fingerprints[name], manifest.get(name)):
+                    print(f"[pipeline] {name} unchanged, skipped")
+                    done.add(name)
+                    continue
+                # Each stage gets its own copy of the caller's context so
+                # fetch_deadline() and other contextvars carry over.
+                ctx = contextvars.copy_context()
+                running[pool.submit(ctx.run, run_stage, name, dict(results))] = name
+
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                done.add(name)
+                try:
+                    results[name], reads = future.result()
+                except Exception as exc:
+                    print(f"[pipeline] {name} failed: {exc}")
+                    failed.add(name)
+                    manifest.pop(name, None)
+                    continue
+                manifest[name] = {
+                    "fingerprint": fingerprints[name],
+                    "reads": reads,
+                    "outputs": {path: file_hash(path) for path in STAGES[name]["outputs"]},
+                }
+
+    wait_for_refreshes()
+    save_manifest(manifest)
+    return results, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", nargs="+", choices=list(STAGES), help="run just these stages")
+    parser.add_argument("--workers", type=int, default=None, help="max stages running at once")
+    parser.add_argument("--force", action="store_true", help="run stages even if their inputs are unchanged")
+    parser.add_argument("--fetch-budget", type=float, default=None, help="seconds of fetching before serving cache")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    _, failed = run_pipeline(args.only, args.workers, args.force, args.fetch_budget)
+    print(f"[pipeline] done in {time.perf_counter() - started:.1f}s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
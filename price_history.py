@@ -0,0 +1,85 @@
+"""CoinGecko price histories kept in history_store, shared by the stages.
+
+The long-term and short-term stages both read coingecko_daily through
+get_crypto_history(), so one incremental fetch serves both. The stages run
+in parallel threads and either may append to a series while the other reads
+it, so the bars handed out here are copies taken under the series lock
+rather than memory-mapped views.
+"""
+
+import math
+import time
+
+import numpy as np
+
+from api_utils import canonical_request_key, fetch_json_with_cache
+from history_store import DAY, append_rows, last_per_period, last_timestamp, read_series
+
+COINGECKO = "https://api.coingecko.com/api/v3"
+
+
+def stored_history(source, name, columns, since=None, copy=False):
+    """Stored columns from history_store for the rows that have the first one.
+
+    The arrays stay index-aligned: a row without the first column (the close)
+    is left out of all of them, and gaps in the other columns stay NaN. Without
+    such rows the arrays are memory-mapped views of the store's files unless
+    copy is set (see read_series).
+    """
+    data = read_series(source, name, columns, since=since, copy=copy)
+    missing = np.isnan(data[columns[0]])
+    if missing.any():
+        return [data[column][~missing] for column in columns]
+    return [data[column] for column in columns]
+
+
+def get_crypto_history(asset, days=365):
+    """Daily closes, market caps and volumes for the last `days` days.
+
+    The first run seeds the history store from market_chart; later runs
+    fetch only the days since the newest stored bar from market_chart/range.
+    """
+    since = last_timestamp("coingecko_daily", asset)
+    day_start = None
+    try:
+        if since is None:
+            url = f"{COINGECKO}/coins/{asset}/market_chart"
+            params = {"vs_currency": "usd", "days": days}
+            cache_key = None
+        else:
+            # Bars are labelled by their day's end: refetch the newest, still
+            # forming day so it ends with its final close.
+            day_start = (math.ceil(since / DAY) - 1) * DAY
+            url = f"{COINGECKO}/coins/{asset}/market_chart/range"
+            params = {"vs_currency": "usd", "from": int(day_start), "to": int(time.time())}
+            cache_key = canonical_request_key(url, {"vs_currency": "usd", "from": int(day_start)})
+        payload, source = fetch_json_with_cache(
+            url,
+            params=params,
+            namespace="coingecko_market_chart",
+            cache_key=cache_key,
+            retries=5,
+        )
+        bars = {}
+        for column, key in (("close", "prices"), ("market_cap", "market_caps"), ("volume", "total_volumes")):
+            for point in payload.get(key, []):
+                if len(point) == 2 and isinstance(point[1], (int, float)):
+                    bars.setdefault(point[0] / 1000.0, {})[column] = point[1]
+        # A point exactly at day_start closes the day before, which is already stored.
+        timestamps = sorted(ts for ts in bars if day_start is None or ts > day_start)
+        if timestamps:
+            rows = {"timestamp": timestamps}
+            for column in ("close", "market_cap", "volume"):
+                rows[column] = [bars[ts].get(column, math.nan) for ts in timestamps]
+            replace_from = None if day_start is None else math.nextafter(day_start, math.inf)
+            append_rows("coingecko_daily", asset, last_per_period(rows), replace_from)
+    except Exception:
+        if since is None:
+            return [], [], [], "unavailable"
+        source = "cache"
+
+    window_start = (time.time() // DAY - days) * DAY
+    prices, market_caps, volumes = stored_history(
+        "coingecko_daily", asset, ("close", "market_cap", "volume"), window_start, copy=True
+    )
+    return prices, market_caps, volumes, source
@@ -0,0 +1,254 @@
+"""Long-term scoring rubrics as data, evaluated for many assets at once.
+
+A rubric gives each pillar a weight and lists its rules. A rule scores one
+metric (a key of the "metrics" dict in the long-term results) 100 at or past
+`good`, 0 at or past `bad` and linearly in between; "higher" or "lower" says
+which side is good, and the optional transform first turns a fraction into a
+percent ("pct") or takes the absolute value ("abs"). A pillar is the mean of
+the scores of its present metrics, and the composite is the weighted mean of
+the pillars that have a score. A metric is missing when it is None or NaN.
+
+compile_rubric() turns a rubric into flat arrays once; score_matrix() then
+scores an assets x metrics matrix with a few NumPy operations per rule
+column, so stored results can be re-scored in bulk after a rubric change.
+The scores match the per-asset score_threshold / mean_or_none /
+weighted_score chain it replaces up to float rounding in the last bits.
+
+    python scoring_rubric.py             # print the rubrics
+    python scoring_rubric.py --rescore   # re-score stored long-term results
+"""
+
+import argparse
+import json
+import time
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+RESULTS_DIR = Path("data/results/long_term")
+DIRECTIONS = ("higher", "lower")
+TRANSFORMS = (None, "pct", "abs")
+
+# Rules are (pillar, metric, good, bad, direction, transform).
+CRYPTO = {
+    "weights": {"tokenomics": 20, "usage": 25, "dev_security": 20, "liquidity": 15, "macro_narrative": 20},
+    "rules": [
+        ("tokenomics", "circulating_ratio", 0.90, 0.45, "higher", None),
+        ("tokenomics", "fdv_ratio", 1.15, 2.5, "lower", None),
+        ("tokenomics", "max_supply_ratio", 0.80, 0.35, "higher", None),
+        ("usage", "usage_growth_proxy", 1.15, 0.75, "higher", None),
+        ("usage", "nvt_proxy", 20, 140, "lower", None),
+        ("usage", "turnover", 0.08, 0.01, "higher", None),
+        ("dev_security", "commit_4w", 250, 25, "higher", None),
+        ("dev_security", "stars", 30000, 2000, "higher", None),
+        ("liquidity", "turnover", 0.10, 0.01, "higher", None),
+        ("liquidity", "max_drawdown", 25, 75, "lower", "abs"),
+        ("macro_narrative", "price_to_ma", 1.05, 0.70, "higher", None),
+        ("macro_narrative", "price_percentile", 65, 20, "higher", None),
+        ("macro_narrative", "max_drawdown", 25, 80, "lower", "abs"),
+    ],
+}
+
+TRADITIONAL_WEIGHTS = {"valuation": 25, "growth_profit": 25, "balance_cashflow": 20, "comp_mgmt": 15, "macro_reg": 15}
+# Balance sheet, management and macro pillars shared by every traditional asset type.
+TRADITIONAL_COMMON = [
+    ("balance_cashflow", "debt_to_equity", 40, 220, "lower", None),
+    ("balance_cashflow", "current_ratio", 1.8, 0.8, "higher", None),
+    ("balance_cashflow", "fcf_yield", 8, 0, "higher", "pct"),
+    ("balance_cashflow", "payout_ratio", 45, 120, "lower", "pct"),
+    ("comp_mgmt", "roe", 18, 6, "higher", "pct"),
+    ("comp_mgmt", "insider_ownership", 8, 0.2, "higher", "pct"),
+    ("comp_mgmt", "institutional_ownership", 75, 20, "higher", "pct"),
+    ("macro_reg", "beta", 0.9, 1.8, "lower", None),
+    ("macro_reg", "max_drawdown", 20, 60, "lower", "abs"),
+    ("macro_reg", "ann_vol", 12, 45, "lower", "abs"),
+]
+
+EQUITY = {
+    "weights": TRADITIONAL_WEIGHTS,
+    "rules": [
+        ("valuation", "trailing_pe", 16, 45, "lower", None),
+        ("valuation", "price_to_book", 3, 18, "lower", None),
+        ("valuation", "peg", 1.4, 3.0, "lower", None),
+        ("valuation", "price_percentile", 55, 90, "lower", None),
+        ("growth_profit", "revenue_growth", 12, -5, "higher", "pct"),
+        ("growth_profit", "eps_growth", 15, -8, "higher", "pct"),
+        ("growth_profit", "gross_margin", 45, 20, "higher", "pct"),
+        ("growth_profit", "net_margin", 18, 4, "higher", "pct"),
+        *TRADITIONAL_COMMON,
+    ],
+}
+
+ETF = {
+    "weights": TRADITIONAL_WEIGHTS,
+    "rules": [
+        ("valuation", "price_percentile", 50, 90, "lower", None),
+        ("valuation", "expense_ratio", 0.10, 0.95, "lower", "pct"),
+        ("valuation", "dividend_yield", 1.5, 0.0, "higher", "pct"),
+        ("growth_profit", "price_to_ma", 1.05, 0.80, "higher", None),
+        ("growth_profit", "dividend_yield", 2.0, 0.0, "higher", "pct"),
+        *TRADITIONAL_COMMON,
+    ],
+}
+
+# Commodities and any other traditional asset type.
+TRADITIONAL = {
+    "weights": TRADITIONAL_WEIGHTS,
+    "rules": [
+        ("valuation", "price_percentile", 45, 90, "lower", None),
+        ("valuation", "price_to_ma", 1.00, 1.35, "lower", None),
+        ("growth_profit", "price_to_ma", 1.08, 0.80, "higher", None),
+        *TRADITIONAL_COMMON,
+    ],
+}
+
+RUBRICS = {"crypto": CRYPTO, "equity": EQUITY, "etf": ETF, "traditional": TRADITIONAL}
+
+
+def rubric_name(market_type, asset_type=None):
+    """Rubric that scores an asset of this market and asset type."""
+    if market_type == "crypto":
+        return "crypto"
+    return asset_type if asset_type in RUBRICS else "traditional"
+
+
+@lru_cache(maxsize=None)
+def compile_rubric(name):
+    """Flat per-rule arrays for a rubric in RUBRICS."""
+    rubric = RUBRICS[name]
+    pillars = list(rubric["weights"])
+    rules = rubric["rules"]
+    for pillar, metric, good, bad, direction, transform in rules:
+        if pillar not in pillars or direction not in DIRECTIONS or transform not in TRANSFORMS:
+            raise ValueError(f"Bad rule in rubric {name}: {pillar}/{metric} ({direction}, {transform})")
+    metrics = list(dict.fromkeys(rule[1] for rule in rules))
+    return {
+        "name": name,
+        "pillars": pillars,
+        "weights": [rubric["weights"][pillar] for pillar in pillars],
+        "metrics": metrics,
+        "pillar": np.array([pillars.index(rule[0]) for rule in rules]),
+        "column": np.array([metrics.index(rule[1]) for rule in rules]),
+        "good": np.array([rule[2] for rule in rules], dtype=np.float64),
+        "bad": np.array([rule[3] for rule in rules], dtype=np.float64),
+        "higher": np.array([rule[4] == "higher" for rule in rules]),
+        "pct": np.array([rule[5] == "pct" for rule in rules]),
+        "abs": np.array([rule[5] == "abs" for rule in rules]),
+    }
+
+
+def metric_matrix(compiled, rows):
+    """assets x metrics float matrix from metrics dicts, NaN where a value is missing."""
+    return np.array(
+        [[np.nan if row.get(metric) is None else row[metric] for metric in compiled["metrics"]] for row in rows],
+        dtype=np.float64,
+    ).reshape(len(rows), len(compiled["metrics"]))
+
+
+def _rule_scores(compiled, matrix):
+    x = matrix[:, compiled["column"]]
+    x = np.where(compiled["pct"], x * 100, x)
+    x = np.where(compiled["abs"], np.abs(x), x)
+    good, bad = compiled["good"], compiled["bad"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        up = np.where(x >= good, 100.0, np.where(x <= bad, 0.0, 100.0 * (x - bad) / (good - bad)))
+        down = np.where(x <= good, 100.0, np.where(x >= bad, 0.0, 100.0 * (bad - x) / (bad - good)))
+    return np.where(np.isnan(x), np.nan, np.where(compiled["higher"], up, down))
+
+
+def _nanmean(scores):
+    """Row means over the non-NaN columns; NaN for rows without values."""
+    present = ~np.isnan(scores)
+    count = present.sum(axis=1)
+    total = np.where(present, scores, 0.0).sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(count > 0, total / count, np.nan)
+
+
+def score_matrix(compiled, matrix):
+    """Pillar scores (assets x pillars, NaN when a pillar has no metrics),
+    composites and used weights for an assets x metrics matrix."""
+    scores = _rule_scores(compiled, matrix)
+    pillars = np.full((len(matrix), len(compiled["pillars"])), np.nan)
+    for idx in range(len(compiled["pillars"])):
+        pillars[:, idx] = _nanmean(scores[:, compiled["pillar"] == idx])
+
+    total = np.zeros(len(matrix))
+    used = np.zeros(len(matrix))
+    for idx, weight in enumerate(compiled["weights"]):
+        have = ~np.isnan(pillars[:, idx])
+        total = np.where(have, total + pillars[:, idx] * weight, total)
+        used = np.where(have, used + weight, used)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        composite = np.where(used > 0, total / used, np.nan)
+    return {"pillars": pillars, "composite": composite, "used_weight": used}
+
+
+def _none_if_nan(value):
+    return None if np.isnan(value) else float(value)
+
+
+def score_asset(name, metrics):
+    """(pillar scores, weights, composite, used weight) for one asset's metrics dict.
+
+    Pillars and the composite are None when they have no data.
+    """
+    compiled = compile_rubric(name)
+    result = score_matrix(compiled, metric_matrix(compiled, [metrics]))
+    score_map = {pillar: _none_if_nan(result["pillars"][0, idx]) for idx, pillar in enumerate(compiled["pillars"])}
+    return score_map, dict(RUBRICS[name]["weights"]), _none_if_nan(result["composite"][0]), float(result["used_weight"][0])
+
+
+def rescore_results(results_dir=RESULTS_DIR):
+    """Stored long-term results re-scored with the current rubrics, one batch per rubric.
+
+    Returns {asset id: (stored composite, new composite)}.
+    """
+    groups = {}
+    for path in sorted(Path(results_dir).glob("*.json")):
+        if path.stem == "index":
+            continue
+        result = json.loads(path.read_text(encoding="utf-8"))
+        name = rubric_name(result.get("market_type"), result.get("asset_type"))
+        groups.setdefault(name, []).append(result)
+
+    rescored = {}
+    for name, results in groups.items():
+        compiled = compile_rubric(name)
+        composites = score_matrix(compiled, metric_matrix(compiled, [r.get("metrics", {}) for r in results]))["composite"]
+        for result, composite in zip(results, composites):
+            rescored[result["asset"]] = (result.get("composite"), _none_if_nan(composite))
+    return rescored
+
+
+def print_rubrics():
+    for name, rubric in RUBRICS.items():
+        print(f"{name}:")
+        for pillar, weight in rubric["weights"].items():
+            print(f"  {pillar} ({weight}%)")
+            for rule_pillar, metric, good, bad, direction, transform in rubric["rules"]:
+                if rule_pillar == pillar:
+                    shown = f"{transform}({metric})" if transform else metric
+                    print(f"    {shown}: good {good}, bad {bad}, {direction} is better")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Print the long-term scoring rubrics or re-score stored results.")
+    parser.add_argument("--rescore", action="store_true", help=f"re-score the results in {RESULTS_DIR}")
+    args = parser.parse_args(argv)
+    if not args.rescore:
+        print_rubrics()
+        return
+    started = time.perf_counter()
+    rescored = rescore_results()
+    elapsed = (time.perf_counter() - started) * 1000
+    for asset_id, (stored, new) in rescored.items():
+        stored_text = "N/A" if stored is None else f"{stored:.1f}"
+        new_text = "N/A" if new is None else f"{new:.1f}"
+        print(f"{asset_id}: {stored_text} -> {new_text}")
+    print(f"Re-scored {len(rescored)} results in {elapsed:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
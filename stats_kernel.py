@@ -0,0 +1,75 @@
+"""Price-history statistics computed together over one NumPy array.
+
+price_stats() converts the history once and returns annualized volatility,
+max drawdown, recovery days after the deepest drawdown, the percentile rank
+of a price and a set of quantiles. Returns skip zero prices, volatility is
+the population standard deviation (np.std, which agrees with
+statistics.pstdev to within a few ulps), quantiles index the sorted history
+at int((n - 1) * q) and the percentile counts prices at or below the value.
+"""
+
+import math
+
+import numpy as np
+
+SCENARIO_QUANTILES = (0.2, 0.5, 0.8)
+MIN_VOL_POINTS = 20
+
+
+def _annualized_volatility(prices):
+    if len(prices) < MIN_VOL_POINTS:
+        return None
+    prev, curr = prices[:-1], prices[1:]
+    mask = (prev != 0) & (curr != 0)
+    if np.count_nonzero(mask) < MIN_VOL_POINTS:
+        return None
+    returns = curr[mask] / prev[mask] - 1
+    return float(np.std(returns)) * math.sqrt(252) * 100.0
+
+
+def _max_drawdown(prices):
+    peaks = np.maximum.accumulate(prices)
+    mask = peaks != 0
+    drawdowns = (prices[mask] / peaks[mask] - 1.0) * 100.0
+    return min(0.0, float(drawdowns.min())) if drawdowns.size else 0.0
+
+
+def _recovery_days(prices):
+    if len(prices) < 3:
+        return None
+    peak_idx = int(prices.argmax())
+    trough_idx = peak_idx + int(prices[peak_idx:].argmin())
+    if trough_idx <= peak_idx:
+        return None
+    recovered = np.flatnonzero(prices[trough_idx:] >= prices[peak_idx])
+    return int(recovered[0]) if recovered.size else None
+
+
+def price_stats(prices, current=None, quantiles=SCENARIO_QUANTILES):
+    """All history statistics for a price series in one call.
+
+    `current` is the price to rank against the history; the percentile is
+    None without it. Every value is None when the series is empty.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    n = len(prices)
+    if n == 0:
+        return {
+            "ann_vol": None,
+            "max_drawdown": None,
+            "recovery_days": None,
+            "percentile": None,
+            "quantiles": {q: None for q in quantiles},
+        }
+
+    # A partial sort places every requested order statistic in one pass.
+    ranks = sorted({int((n - 1) * q) for q in quantiles})
+    partitioned = np.partition(prices, ranks) if ranks else prices
+
+    return {
+        "ann_vol": _annualized_volatility(prices),
+        "max_drawdown": _max_drawdown(prices),
+        "recovery_days": _recovery_days(prices),
+        "percentile": None if current is None else 100.0 * int(np.count_nonzero(prices <= current)) / n,
+        "quantiles": {q: float(partitioned[int((n - 1) * q)]) for q in quantiles},
+    }
@@ -0,0 +1,29 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+def _clear_universe_caches():
+    import universe
+
+    for cached in (universe.load_universe, universe.assets, universe._by_id):
+        cached.cache_clear()
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Run in an empty tree that holds only a copy of the asset universe."""
+    (tmp_path / "data").mkdir()
+    (tmp_path / "data" / "universe.json").write_bytes((ROOT / "data" / "universe.json").read_bytes())
+    monkeypatch.chdir(tmp_path)
+    _clear_universe_caches()
+    yield tmp_path
+    _clear_universe_caches()
+
+
+def unavailable(*args, **kwargs):
+    raise RuntimeError("offline")
@@ -0,0 +1,75 @@
+import os
+import threading
+import time
+
+import cache_manager
+from cache_manager import FileCache
+
+
+def test_eviction_drains_to_the_low_water_mark(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_manager, "CACHE_COMPRESSION", "none")
+    monkeypatch.setattr(cache_manager, "MAX_CACHE_BYTES", 10_000)
+    cache = FileCache(tmp_path)
+    for idx in range(10):
+        cache.write_entry("test", f"key{idx}", "x" * 1000, {})
+    assert len(cache.list_entries()) == 10
+
+    cache.write_entry("test", "key10", "x" * 1000, {})
+    sizes = [entry["size"] for entry in cache.list_entries()]
+    assert sum(sizes) <= 10_000 * cache_manager.EVICTION_LOW_WATER
+    assert not cache.has_entry("test", "key0")
+
+    # Back under budget: the next write does not evict anything.
+    count = len(sizes)
+    cache.write_entry("test", "key11", "x" * 1000, {})
+    assert len(cache.list_entries()) == count + 1
+
+
+def test_hits_stay_in_memory_until_flushed(tmp_path):
+    cache = FileCache(tmp_path)
+    cache.write_entry("test", "key", "body", {"url": "https://example.com"})
+    meta_file = cache._meta_path(cache._body_file("test", "key"))
+    written = meta_file.read_bytes()
+
+    assert cache.read_entry("test", "key") == "body"
+    assert cache.read_entry("test", "key") == "body"
+    assert meta_file.read_bytes() == written
+    assert cache.list_entries()[0]["hits"] == 2
+
+    cache.flush_hits()
+    assert cache.read_meta("test", "key")["hits"] == 2
+    assert cache.read_meta("test", "key")["url"] == "https://example.com"
+    assert cache.list_entries()[0]["hits"] == 2
+
+
+def test_concurrent_meta_updates_are_not_lost(tmp_path):
+    cache = FileCache(tmp_path)
+    cache.write_entry("test", "key", "body", {})
+
+    def update(idx):
+        for _ in range(20):
+            cache.update_meta("test", "key", **{f"field{idx}": idx})
+        cache.read_entry("test", "key")
+
+    threads = [threading.Thread(target=update, args=(idx,)) for idx in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    cache.flush_hits()
+    meta = cache.read_meta("test", "key")
+    assert all(meta[f"field{idx}"] == idx for idx in range(8))
+    assert meta["hits"] == 8
+
+
+def test_compact_keeps_recent_temporary_files(tmp_path):
+    cache = FileCache(tmp_path)
+    fresh = tmp_path / "test_abc.json.gz.1.2.tmp"
+    stale = tmp_path / "test_def.json.gz.1.2.tmp"
+    fresh.write_bytes(b"in progress")
+    stale.write_bytes(b"abandoned")
+    old = time.time() - 2 * cache_manager.TMP_MAX_AGE
+    os.utime(stale, (old, old))
+
+    assert cache.compact() == 1
+    assert fresh.exists() and not stale.exists()
@@ -0,0 +1,67 @@
+import time
+
+import requests
+
+import api_utils
+import cassette
+
+COINS = ("bitcoin", "ethereum", "solana", "cardano", "polkadot")
+
+
+def response(request, status, body):
+    resp = requests.Response()
+    resp.status_code = status
+    resp._content = body.encode("utf-8")
+    resp.headers["Content-Type"] = "application/json"
+    resp.request = request
+    return resp
+
+
+def coin_request(coin):
+    return requests.Request("GET", f"https://api.coingecko.com/api/v3/coins/{coin}").prepare()
+
+
+def test_replays_skip_the_rate_limiter(workdir, monkeypatch):
+    for coin in COINS:
+        request = coin_request(coin)
+        cassette.save_interaction(cassette.CASSETTE_DIR, request, response(request, 200, f'{{"id": "{coin}"}}'))
+    monkeypatch.setattr(cassette, "HTTP_MODE", "replay")
+    monkeypatch.setattr(api_utils, "_session", None)
+    api_utils.configure_session()
+    sleeps = []
+    monkeypatch.setattr(api_utils.time, "sleep", sleeps.append)
+
+    durations = []
+    for _ in range(2):
+        started = time.perf_counter()
+        for coin in COINS:
+            payload, source = api_utils.fetch_json_with_cache(
+                f"https://api.coingecko.com/api/v3/coins/{coin}", namespace="test", ttl=0
+            )
+            assert payload == {"id": coin} and source == "live"
+        durations.append(time.perf_counter() - started)
+
+    # Five requests exceed the CoinGecko burst of 3, yet nothing waited.
+    assert sleeps == [0.0] * len(sleeps)
+    assert not (api_utils.RATE_LIMIT_DIR / "api.coingecko.com.json").exists()
+    assert max(durations) < 1.0
+
+
+def test_a_failed_retry_does_not_replace_the_recording(workdir, monkeypatch):
+    statuses = iter([(429, '{"error": "rate limited"}'), (200, '{"id": "bitcoin"}'), (503, "")])
+    monkeypatch.setattr(
+        cassette.HTTPAdapter, "send", lambda self, request, **kwargs: response(request, *next(statuses))
+    )
+    recorder = cassette.RecordingAdapter()
+    for _ in range(3):
+        recorder.send(coin_request("bitcoin"))
+
+    replayed = cassette.ReplayAdapter().send(coin_request("bitcoin"))
+    assert replayed.status_code == 200
+    assert replayed.json() == {"id": "bitcoin"}
+
+
+def test_a_request_that_never_succeeded_replays_its_failure(workdir, monkeypatch):
+    monkeypatch.setattr(cassette.HTTPAdapter, "send", lambda self, request, **kwargs: response(request, 404, "{}"))
+    cassette.RecordingAdapter().send(coin_request("unknown-coin"))
+    assert cassette.ReplayAdapter().send(coin_request("unknown-coin")).status_code == 404
@@ -0,0 +1,58 @@
+import threading
+import time
+
+import api_utils
+
+HOST = "api.example.com"
+
+
+def cooled_down():
+    return {"failures": api_utils.BREAKER_THRESHOLD, "opened_at": time.time() - api_utils.BREAKER_COOLDOWN - 1, "probe": None}
+
+
+def in_threads(count, func):
+    results = [None] * count
+    barrier = threading.Barrier(count)
+
+    def run(idx):
+        barrier.wait()
+        results[idx] = func()
+        barrier.wait()  # keep every thread alive until all have asked
+
+    threads = [threading.Thread(target=run, args=(idx,)) for idx in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_half_open_circuit_lets_one_probe_through(monkeypatch):
+    monkeypatch.setattr(api_utils, "_breakers", {HOST: cooled_down()})
+
+    assert sorted(in_threads(8, lambda: api_utils._circuit_open(HOST))) == [False] + [True] * 7
+    # The probe is still out, so everyone else keeps using the cache.
+    assert api_utils._circuit_open(HOST)
+
+
+def test_probe_outcome_resolves_the_circuit(monkeypatch):
+    monkeypatch.setattr(api_utils, "_breakers", {HOST: cooled_down()})
+
+    assert not api_utils._circuit_open(HOST)
+    assert in_threads(2, lambda: api_utils._circuit_open(HOST)) == [True, True]
+    api_utils._record_failure(HOST)
+    assert api_utils._circuit_open(HOST)
+    assert in_threads(2, lambda: api_utils._circuit_open(HOST)) == [True, True]
+
+    api_utils._breakers[HOST] = cooled_down()
+    assert not api_utils._circuit_open(HOST)
+    api_utils._record_success(HOST)
+    assert in_threads(2, lambda: api_utils._circuit_open(HOST)) == [False, False]
+
+
+def test_an_unresolved_probe_is_released(monkeypatch):
+    monkeypatch.setattr(api_utils, "_breakers", {HOST: cooled_down()})
+
+    assert not api_utils._circuit_open(HOST)
+    api_utils._release_probe(HOST)
+    assert sorted(in_threads(4, lambda: api_utils._circuit_open(HOST))) == [False, True, True, True]
@@ -0,0 +1,38 @@
+import pytest
+import requests
+
+import api_utils
+import fetch_metrics
+
+
+class RefusingSession(requests.Session):
+    def get(self, url, params=None, **kwargs):
+        query = "&".join(f"{key}={value}" for key, value in params.items())
+        raise requests.ConnectionError(
+            f"HTTPSConnectionPool(host='example.com', port=443): Max retries exceeded with url: "
+            f"/query?{query} (Caused by NameResolutionError)"
+        )
+
+
+def test_recorded_errors_leave_out_query_strings(workdir, monkeypatch):
+    monkeypatch.setattr(api_utils, "get_session", lambda: RefusingSession())
+    fetch_metrics.reset_metrics()
+    with pytest.raises(RuntimeError):
+        api_utils.fetch_json_with_cache(
+            "https://example.com/query",
+            params={"function": "OVERVIEW", "symbol": "AAPL", "apikey": "SECRET123"},
+            namespace="test",
+            retries=1,
+        )
+
+    (row,) = fetch_metrics.get_records()
+    assert "Max retries exceeded with url: /query (Caused by" in row["error"]
+    json_file = fetch_metrics.dump_metrics(workdir / "metrics", stem="run")
+    for path in (json_file, json_file.with_suffix(".csv")):
+        assert "SECRET123" not in path.read_text(encoding="utf-8")
+    fetch_metrics.reset_metrics()
+
+
+def test_scrub_keeps_plain_question_marks():
+    text = "HTTP 401 from https://www.alphavantage.co/query?apikey=abc&symbol=X - is the key valid?"
+    assert fetch_metrics.scrub_query_strings(text) == "HTTP 401 from https://www.alphavantage.co/query - is the key valid?"
@@ -0,0 +1,24 @@
+from history_store import DAY, append_rows, last_per_month, last_per_period, read_series
+
+
+def test_last_per_period_labels_bars_by_period_end():
+    rows = {"timestamp": [DAY, DAY + 3600, 2 * DAY, 2 * DAY + 600], "close": [1.0, 2.0, 3.0, 4.0]}
+    kept = last_per_period(rows)
+    # A midnight point closes the day before it; intraday points belong to the day that ends next.
+    assert kept["timestamp"].tolist() == [DAY, 2 * DAY, 3 * DAY]
+    assert kept["close"].tolist() == [1.0, 3.0, 4.0]
+
+
+def test_forming_bar_is_replaced_in_place(workdir):
+    append_rows("test", "x", last_per_period({"timestamp": [DAY, DAY + 3600], "close": [1.0, 2.0]}))
+    append_rows("test", "x", last_per_period({"timestamp": [DAY + 7200], "close": [2.5]}))
+    bars = read_series("test", "x")
+    assert bars["timestamp"].tolist() == [DAY, 2 * DAY]
+    assert bars["close"].tolist() == [1.0, 2.5]
+
+
+def test_last_per_month_keeps_newest_bar_per_month():
+    oct_10, oct_17, nov_3 = 1791590400.0, 1792195200.0, 1793664000.0  # 2026-10-10, 2026-10-17, 2026-11-03
+    kept = last_per_month({"timestamp": [oct_17, oct_10, nov_3], "close": [2.0, 1.0, 3.0]})
+    assert kept["timestamp"].tolist() == [oct_17, nov_3]
+    assert kept["close"].tolist() == [2.0, 3.0]
@@ -0,0 +1,35 @@
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+from conftest import unavailable
+
+
+def _outputs():
+    files = [p for root in ("reports", "data/results", "data/assets") for p in Path(root).rglob("*") if p.is_file()]
+    return {p.as_posix(): p.read_bytes() for p in files}
+
+
+def test_second_run_leaves_outputs_unchanged(workdir, monkeypatch):
+    import analysis_longterm
+    import build_asset_snapshots
+
+    clock = {"now": datetime(2026, 1, 5, 9, 0, tzinfo=UTC)}
+
+    class Clock(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return clock["now"]
+
+    for module in (analysis_longterm, build_asset_snapshots):
+        monkeypatch.setattr(module, "datetime", Clock)
+    monkeypatch.setattr(analysis_longterm, "fetch_json_with_cache", unavailable)
+    monkeypatch.setattr(analysis_longterm, "fetch_text_with_cache", unavailable)
+
+    build_asset_snapshots.build_assets(long_index=analysis_longterm.generate_report())
+    first = _outputs()
+    clock["now"] += timedelta(minutes=1)
+    build_asset_snapshots.build_assets(long_index=analysis_longterm.generate_report())
+
+    assert "data/results/long_term/index.json" in first
+    assert "data/assets/index.json" in first
+    assert _outputs() == first
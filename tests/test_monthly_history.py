@@ -0,0 +1,39 @@
+from conftest import unavailable
+
+CSV_HEADER = "Date,Open,High,Low,Close,Volume\n"
+
+
+def test_stooq_forming_month_is_replaced(workdir, monkeypatch):
+    import analysis_longterm
+
+    responses = [
+        CSV_HEADER + "2026-08-31,1,1,1,10,5\n2026-09-30,1,1,1,11,5\n2026-10-10,1,1,1,12,5\n",
+        # The forming month again, dated by a later trading day.
+        CSV_HEADER + "2026-10-17,1,1,1,13,5\n",
+    ]
+    urls = []
+
+    def fake_fetch(url, **kwargs):
+        urls.append(url)
+        return responses[len(urls) - 1], "live"
+
+    monkeypatch.setattr(analysis_longterm, "fetch_text_with_cache", fake_fetch)
+    prices, _ = analysis_longterm.get_stooq_history("xauusd")
+    assert prices.tolist() == [10.0, 11.0, 12.0]
+
+    prices, _ = analysis_longterm.get_stooq_history("xauusd")
+    assert urls[1].endswith("&d1=20261010")
+    assert prices.tolist() == [10.0, 11.0, 13.0]
+
+    monkeypatch.setattr(analysis_longterm, "fetch_text_with_cache", unavailable)
+    prices, source = analysis_longterm.get_stooq_history("xauusd")
+    assert prices.tolist() == [10.0, 11.0, 13.0] and source == "stooq_cache"
+
+
+def test_same_month_rows_in_one_response_collapse(workdir, monkeypatch):
+    import analysis_longterm
+
+    text = CSV_HEADER + "2026-09-30,1,1,1,11,5\n2026-10-10,1,1,1,12,5\n2026-10-17,1,1,1,13,5\n"
+    monkeypatch.setattr(analysis_longterm, "fetch_text_with_cache", lambda url, **kwargs: (text, "live"))
+    prices, _ = analysis_longterm.get_stooq_history("xauusd")
+    assert prices.tolist() == [11.0, 13.0]
@@ -0,0 +1,58 @@
+import shutil
+
+from conftest import ROOT
+
+
+def test_editing_an_imported_module_invalidates_the_stage(workdir, monkeypatch):
+    import pipeline
+
+    code = workdir / "code"
+    code.mkdir()
+    for path in ROOT.glob("*.py"):
+        shutil.copy(path, code / path.name)
+    monkeypatch.setattr(pipeline, "ROOT", code)
+
+    before = {name: pipeline.stage_fingerprint(name) for name in pipeline.STAGES}
+    with open(code / "scoring_rubric.py", "a", encoding="utf-8") as handle:
+        handle.write("\n# weights changed\n")
+    after = {name: pipeline.stage_fingerprint(name) for name in pipeline.STAGES}
+
+    assert after["long_term"] != before["long_term"]
+    assert after["news"] == before["news"]
+    assert after["watchlist_quotes"] == before["watchlist_quotes"]
+
+
+def test_deferred_imports_count(workdir, monkeypatch):
+    import pipeline
+
+    names = {path.name for path in pipeline.local_modules("analysis")}
+    # analysis.py imports history_store and indicators inside functions.
+    assert {"history_store.py", "indicators.py"} <= names
+
+
+def test_universe_edits_leave_news_alone(workdir):
+    import pipeline
+
+    before = {name: pipeline.stage_fingerprint(name) for name in pipeline.STAGES}
+    with open(workdir / "data" / "universe.json", "a", encoding="utf-8") as handle:
+        handle.write("\n")
+    after = {name: pipeline.stage_fingerprint(name) for name in pipeline.STAGES}
+
+    assert after["news"] == before["news"]
+    assert after["long_term"] != before["long_term"]
+
+
+def test_the_fetch_budget_starts_with_the_run(workdir, monkeypatch):
+    import api_utils
+    import pipeline
+
+    budgets = []
+    monkeypatch.setattr(pipeline, "STAGES", {"probe": {"run": "probe:run", "inputs": {}, "files": [], "outputs": []}})
+    monkeypatch.setattr(pipeline, "stage_function", lambda name: lambda: budgets.append(api_utils.remaining_budget()))
+    monkeypatch.setenv("API_FETCH_BUDGET", "30")
+
+    pipeline.run_pipeline(force=True)
+    pipeline.run_pipeline(force=True, fetch_budget=5)
+
+    assert 29 < budgets[0] <= 30 and 4 < budgets[1] <= 5
+    assert api_utils.remaining_budget() is None
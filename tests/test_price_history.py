@@ -0,0 +1,78 @@
+import indicators
+import price_history
+from history_store import DAY
+
+TODAY = 20_000 * DAY
+
+
+def chart(start, closes, intraday=None):
+    """market_chart payload: one point per midnight, optionally a forming point."""
+    points = [[(start + i * DAY) * 1000, close] for i, close in enumerate(closes)]
+    if intraday is not None:
+        points.append(list(intraday))
+    return {"prices": points, "market_caps": points, "total_volumes": points}
+
+
+def test_second_run_extends_the_indicator_state(workdir, monkeypatch):
+    calls = []
+
+    def spy(method):
+        def wrapper(self, *args):
+            calls.append(method.__name__)
+            return method(self, *args)
+        return wrapper
+
+    monkeypatch.setattr(indicators.IndicatorState, "extend", spy(indicators.IndicatorState.extend))
+    monkeypatch.setattr(indicators.IndicatorState, "revise", spy(indicators.IndicatorState.revise))
+
+    # First run at noon: 40 daily closes and today's forming price.
+    monkeypatch.setattr(price_history.time, "time", lambda: TODAY + DAY / 2)
+    first = chart(TODAY - 39 * DAY, [100.0 + i for i in range(40)], ((TODAY + DAY / 2) * 1000, 150.0))
+    monkeypatch.setattr(price_history, "fetch_json_with_cache", lambda url, **kwargs: (first, "live"))
+    prices, _, _, _ = price_history.get_crypto_history("bitcoin")
+    assert prices[-1] == 150.0
+    state = indicators.update_from_store("coingecko_daily", "bitcoin", vol_window=30)
+    assert state.count == 41 and state.last_ts == TODAY + DAY
+    assert calls == ["extend"]
+
+    # Next day: yesterday's final close and a new forming price.
+    now = TODAY + DAY + DAY / 4
+    monkeypatch.setattr(price_history.time, "time", lambda: now)
+    second = chart(TODAY + DAY, [151.0], (now * 1000, 152.0))
+    requests = []
+
+    def fetch_range(url, **kwargs):
+        requests.append(kwargs["params"])
+        return second, "live"
+
+    monkeypatch.setattr(price_history, "fetch_json_with_cache", fetch_range)
+    prices, _, _, _ = price_history.get_crypto_history("bitcoin")
+    assert requests[0]["from"] == TODAY
+    assert prices[-2:].tolist() == [151.0, 152.0]
+
+    calls.clear()
+    state = indicators.update_from_store("coingecko_daily", "bitcoin", vol_window=30)
+    assert calls == ["revise", "extend"]
+    assert state.count == 42 and state.last_ts == TODAY + 2 * DAY
+    assert (state.close(1), state.close()) == (151.0, 152.0)
+
+    # A third call with nothing new stored leaves the state alone.
+    calls.clear()
+    indicators.update_from_store("coingecko_daily", "bitcoin", vol_window=30)
+    assert calls == []
+
+
+def test_a_volume_gap_keeps_the_columns_aligned(workdir, monkeypatch):
+    import math
+
+    monkeypatch.setattr(price_history.time, "time", lambda: TODAY)
+    payload = chart(TODAY - 4 * DAY, [10.0, 11.0, 12.0, 13.0, 14.0])
+    # No volume for the third day, and no close for the fourth.
+    payload["total_volumes"] = [point for idx, point in enumerate(payload["prices"]) if idx != 2]
+    payload["prices"] = [point for idx, point in enumerate(payload["prices"]) if idx != 3]
+    monkeypatch.setattr(price_history, "fetch_json_with_cache", lambda url, **kwargs: (payload, "live"))
+
+    prices, market_caps, volumes, _ = price_history.get_crypto_history("bitcoin")
+    assert prices.tolist() == [10.0, 11.0, 12.0, 14.0]
+    assert market_caps.tolist() == [10.0, 11.0, 12.0, 14.0]
+    assert volumes[[0, 1, 3]].tolist() == [10.0, 11.0, 14.0] and math.isnan(volumes[2])
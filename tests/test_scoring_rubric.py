@@ -0,0 +1,65 @@
+import random
+import statistics
+
+import pytest
+
+from scoring_rubric import RUBRICS, compile_rubric, metric_matrix, score_matrix
+
+# Pillar means are plain float sums, statistics.mean rounds the exact mean once.
+REL_TOLERANCE = 1e-12
+
+
+def threshold(value, good, bad, higher):
+    if higher:
+        return 100.0 if value >= good else 0.0 if value <= bad else 100.0 * (value - bad) / (good - bad)
+    return 100.0 if value <= good else 0.0 if value >= bad else 100.0 * (bad - value) / (bad - good)
+
+
+def reference_scores(name, metrics):
+    """Per-asset scoring the way analysis_longterm did it before the rubrics."""
+    rubric = RUBRICS[name]
+    scores = {pillar: [] for pillar in rubric["weights"]}
+    for pillar, metric, good, bad, direction, transform in rubric["rules"]:
+        value = metrics.get(metric)
+        if value is None:
+            continue
+        value = value * 100 if transform == "pct" else abs(value) if transform == "abs" else value
+        scores[pillar].append(threshold(value, good, bad, direction == "higher"))
+    pillars = {pillar: statistics.mean(values) if values else None for pillar, values in scores.items()}
+    total = used = 0.0
+    for pillar, weight in rubric["weights"].items():
+        if pillars[pillar] is not None:
+            total += pillars[pillar] * weight
+            used += weight
+    return pillars, total / used if used else None
+
+
+def random_metrics(rng, name):
+    metrics = {}
+    for _, metric, good, bad, _, transform in RUBRICS[name]["rules"]:
+        if rng.random() < 0.25:
+            metrics[metric] = None
+            continue
+        low, high = sorted((good, bad))
+        value = rng.uniform(low - (high - low) / 2, high + (high - low) / 2)
+        metrics[metric] = value / 100 if transform == "pct" else value
+    return metrics
+
+
+@pytest.mark.parametrize("name", sorted(RUBRICS))
+def test_score_matrix_matches_per_asset_scoring(name):
+    rng = random.Random(name)
+    rows = [random_metrics(rng, name) for _ in range(200)] + [{}]
+    compiled = compile_rubric(name)
+    result = score_matrix(compiled, metric_matrix(compiled, rows))
+    for row, pillars, composite in zip(rows, result["pillars"], result["composite"]):
+        expected_pillars, expected_composite = reference_scores(name, row)
+        for idx, pillar in enumerate(compiled["pillars"]):
+            if expected_pillars[pillar] is None:
+                assert pillars[idx] != pillars[idx]
+            else:
+                assert pillars[idx] == pytest.approx(expected_pillars[pillar], rel=REL_TOLERANCE, abs=1e-12)
+        if expected_composite is None:
+            assert composite != composite
+        else:
+            assert composite == pytest.approx(expected_composite, rel=REL_TOLERANCE, abs=1e-12)
@@ -0,0 +1,30 @@
+import math
+import random
+import statistics
+
+import pytest
+
+from stats_kernel import price_stats
+
+# np.std sums pairwise and rounds along the way; statistics.pstdev is exact.
+REL_TOLERANCE = 1e-12
+
+
+def reference_ann_vol(prices):
+    returns = [curr / prev - 1 for prev, curr in zip(prices, prices[1:]) if prev and curr]
+    return statistics.pstdev(returns) * math.sqrt(252) * 100.0
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_ann_vol_matches_pstdev(seed):
+    rng = random.Random(seed)
+    prices = [100.0]
+    for _ in range(rng.randrange(20, 3000)):
+        prices.append(prices[-1] * (1 + rng.gauss(0.0003, 0.02)))
+    if seed % 4 == 0:
+        prices[rng.randrange(len(prices))] = 0.0
+    assert price_stats(prices)["ann_vol"] == pytest.approx(reference_ann_vol(prices), rel=REL_TOLERANCE)
+
+
+def test_flat_prices_have_no_volatility():
+    assert price_stats([5.0] * 40)["ann_vol"] == 0.0
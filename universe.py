@@ -0,0 +1,84 @@
+"""Asset universe shared by every stage.
+
+data/universe.json (or ASSET_UNIVERSE) lists each asset once, with the
+pipeline stages that cover it in "stages". It is loaded once per process
+into immutable Asset tuples with interned strings, and per-stage selections
+are cached, so stages iterate the same compact records however many
+symbols the file holds.
+"""
+
+import json
+import os
+import sys
+from collections import namedtuple
+from functools import lru_cache
+from pathlib import Path
+
+UNIVERSE_FILE = Path(os.getenv("ASSET_UNIVERSE", "data/universe.json"))
+
+REQUIRED = ("id", "name", "symbol", "market_type", "asset_type")
+OPTIONAL = (
+    "stages",
+    "stooq",
+    "news_keyword",
+    "details_page",
+    "thesis",
+    "narrative",
+    "macro_note",
+    "about",
+)
+# Short strings repeated across thousands of rows.
+INTERNED = ("market_type", "asset_type")
+
+
+class Asset(namedtuple("Asset", REQUIRED + OPTIONAL, defaults=(None,) * len(OPTIONAL))):
+    __slots__ = ()
+
+    @property
+    def heading(self):
+        return f"{self.name} ({self.symbol})"
+
+
+def _record(row, path):
+    missing = [field for field in REQUIRED if not row.get(field)]
+    if missing:
+        raise ValueError(f"{path}: asset {row.get('id', '?')} is missing {', '.join(missing)}")
+    values = {field: row.get(field) for field in REQUIRED + OPTIONAL}
+    for field in INTERNED:
+        values[field] = sys.intern(values[field])
+    values["stages"] = tuple(sys.intern(stage) for stage in values["stages"] or ())
+    return Asset(**values)
+
+
+@lru_cache(maxsize=None)
+def load_universe(path=None):
+    """All assets in file order."""
+    path = Path(path or UNIVERSE_FILE)
+    rows = json.loads(path.read_text(encoding="utf-8")).get("assets", [])
+    universe = tuple(_record(row, path) for row in rows)
+    ids = [asset.id for asset in universe]
+    if len(set(ids)) != len(ids):
+        duplicates = sorted({asset_id for asset_id in ids if ids.count(asset_id) > 1})
+        raise ValueError(f"{path}: duplicate asset ids {', '.join(duplicates)}")
+    return universe
+
+
+@lru_cache(maxsize=None)
+def assets(stage=None, market_type=None, asset_type=None):
+    """Assets covered by a stage, optionally narrowed by market or asset type."""
+    return tuple(
+        asset
+        for asset in load_universe()
+        if (stage is None or stage in asset.stages)
+        and (market_type is None or asset.market_type == market_type)
+        and (asset_type is None or asset.asset_type == asset_type)
+    )
+
+
+@lru_cache(maxsize=None)
+def _by_id():
+    return {asset.id: asset for asset in load_universe()}
+
+
+def get_asset(asset_id):
+    return _by_id().get(asset_id)